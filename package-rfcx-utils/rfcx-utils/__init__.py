@@ -7,9 +7,32 @@
 3. Use `import rfcx-utils`
 """
 
-from ._textgrid import TextGrid
-from .audio import save_audio_file
-from .audio import praat_slice_audio
-from .audio import csv_slice_audio
-from .audio import csv_download
+import importlib
+
+# The public names are imported on first use (PEP 562), e.g. `TextGrid` does not need pandas or pydub
+_LAZY_ATTRIBUTES = {
+    'TextGrid': '._textgrid',
+    'save_audio_file': '.audio',
+    'praat_slice_audio': '.audio',
+    'csv_slice_audio': '.audio',
+    'csv_download': '.audio',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
 name = "rfcx-utils"
+
+
+def __getattr__(attribute):
+    if attribute in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[attribute], __name__), attribute)
+    elif attribute == 'audio':
+        value = importlib.import_module('.audio', __name__)
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, attribute))
+    globals()[attribute] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
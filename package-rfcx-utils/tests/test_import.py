@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loads rfcx-utils (whose directory is not a valid module name) as `rfcx_utils`
+MEASURE = '''
+import importlib.util, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('rfcx_utils', {init!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules['rfcx_utils'] = module
+spec.loader.exec_module(module)
+from rfcx_utils import TextGrid
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(','.join(sorted(sys.modules)))
+'''
+
+IMPORT_BUDGET_SECONDS = 0.1
+
+
+class ImportTests(TestCase):
+    def test_textgrid_does_not_import_pandas_or_pydub(self):
+        # Act
+        script = MEASURE.format(init=os.path.join(ROOT, 'rfcx-utils', '__init__.py'))
+        output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True).splitlines()
+        elapsed, modules = float(output[0]), set(output[1].split(','))
+        # Assert
+        for heavy in ['pandas', 'pydub', 'rfcx', 'requests']:
+            self.assertNotIn(heavy, modules)
+        self.assertLess(elapsed, IMPORT_BUDGET_SECONDS)
@@ -7,6 +7,35 @@
 3. Use `import rfcx` and [try an example](https://gist.github.com/antonyharfield/93231b3df86cd58fecee4f4d1ec9cc5b)
 """
 
-from .audio import save_audio_file
-from .client import Client
+import importlib
+
+# The public names are imported on first use (PEP 562) so that `import rfcx` stays fast
+_LAZY_ATTRIBUTES = {
+    'save_audio_file': '.audio',
+    'Client': '.client',
+    'AsyncClient': '.async_client',
+    'RetryPolicy': '._http',
+    'SegmentTable': '._segments',
+    'CancellationToken': '._concurrency',
+    'IngestIndex': '._ingest_index',
+    'PageError': '._paging',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
 name = "rfcx"
+
+
+def __getattr__(attribute):
+    if attribute in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[attribute], __name__), attribute)
+    elif attribute in ('audio', 'client', 'async_client', 'ingest'):
+        value = importlib.import_module('.' + attribute, __name__)
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, attribute))
+    globals()[attribute] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
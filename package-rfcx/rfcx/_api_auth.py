@@ -1,10 +1,10 @@
 import datetime
-import httplib2
 import json
 import logging
 from six.moves import http_client
 from six.moves import urllib
 import rfcx._helper as helper
+import rfcx._http as http
 
 
 class Error(Exception):
@@ -15,14 +15,14 @@ class TokenError(Error):
 
 logger = logging.getLogger(__name__)
 
-def authcode_exchange(code, code_verifier, client_id, scope):
+def authcode_exchange(code, code_verifier, client_id, scope, session=None):
     """Exchanges a code for OAuth2Credentials.
     Args:
         code: string, a dict-like object, or None. For a non-device
                 flow, this is either the response code as a string, or a
                 dictionary of query parameters to the redirect_uri. For a
                 device flow, this should be None.
-        http: httplib2.Http, optional http instance to use when fetching
+        session: requests.Session, optional session to use when fetching
                 credentials.
     Returns:
         An OAuth2Credentials object that can be used to authorize requests.
@@ -42,29 +42,28 @@ def authcode_exchange(code, code_verifier, client_id, scope):
         'redirect_uri': 'https://rfcx-app.s3.eu-west-1.amazonaws.com/login/cli.html',
         'scope': scope
     }
-    return _request_token(post_data)
+    return _request_token(post_data, session=session)
 
-def refresh(refresh_token, client_id):
+def refresh(refresh_token, client_id, session=None):
     post_data = {
         'grant_type': 'refresh_token',
         'client_id': client_id,
         'refresh_token': refresh_token
     }
-    access_token, _, token_expiry, id_token = _request_token(post_data)
+    access_token, _, token_expiry, id_token = _request_token(post_data, session=session)
     return access_token, refresh_token, token_expiry, id_token
     
 
-def _request_token(post_data):
+def _request_token(post_data, session=None):
     body = urllib.parse.urlencode(post_data)
     headers = {
         'content-type': 'application/x-www-form-urlencoded',
     }
 
-    http = httplib2.Http()
-
-    resp, content = http.request('https://auth.rfcx.org/oauth/token', method='POST', body=body, headers=headers)
+    resp = http.get_session(session).post('https://auth.rfcx.org/oauth/token', data=body, headers=headers)
+    content = resp.content
     d = _parse_exchange_token_response(content)
-    if resp.status == http_client.OK and 'access_token' in d:
+    if resp.status_code == http_client.OK and 'access_token' in d:
         access_token = d['access_token']
         refresh_token = d.get('refresh_token', None)
         token_expiry = None
@@ -84,7 +83,7 @@ def _request_token(post_data):
             # you never know what those providers got to say
             error_msg = (str(d['error']) + str(d.get('error_description', '')))
         else:
-            error_msg = 'Invalid response: {0}.'.format(str(resp.status))
+            error_msg = 'Invalid response: {0}.'.format(str(resp.status_code))
         raise TokenError(error_msg)
 
 def _parse_exchange_token_response(content):
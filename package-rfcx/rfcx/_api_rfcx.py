@@ -1,15 +1,69 @@
-import httplib2
 import json
 import logging
 from six.moves import http_client
 from six.moves import urllib
+import rfcx._http as http
+import rfcx._json_stream as json_stream
+import rfcx._paging as paging
 
 logger = logging.getLogger(__name__)
 
 host = 'https://api.rfcx.org'  # TODO move to configuration
 
+CHUNK_SIZE = 64 * 1024
 
-def streamSegments(token, stream_id, start, end, limit, offset):
+
+def streamSegments(token, stream_id, start, end, limit, offset, session=None, cache=None, incremental=False):
+    url = _stream_segments_url(stream_id, start, end, limit, offset)
+    return _request(url, token=token, session=session, cache=cache, incremental=incremental)
+
+
+def annotations(token,
+                start,
+                end,
+                classifications=None,
+                stream=None,
+                limit=50,
+                offset=0,
+                session=None,
+                cache=None,
+                incremental=False):
+    url = _annotations_url(start, end, classifications, stream, limit, offset)
+    return _request(url, token=token, session=session, cache=cache, incremental=incremental)
+
+
+def detections(token,
+               start,
+               end,
+               classifications=None,
+               streams=None,
+               min_confidence=None,
+               limit=50,
+               offset=0,
+               session=None,
+               cache=None,
+               incremental=False):
+    url = _detections_url(start, end, classifications, streams, min_confidence, limit, offset)
+    return _request(url, token=token, session=session, cache=cache, incremental=incremental)
+
+
+def streams(token,
+            organizations=None,
+            projects=None,
+            created_by=None,
+            keyword=None,
+            is_public=True,
+            is_deleted=False,
+            limit=1000,
+            offset=0,
+            session=None,
+            cache=None,
+            incremental=False):
+    url = _streams_url(organizations, projects, created_by, keyword, is_public, is_deleted, limit, offset)
+    return _request(url, token=token, session=session, cache=cache, incremental=incremental)
+
+
+def _stream_segments_url(stream_id, start, end, limit, offset):
     data = {
         'id': stream_id,
         'start': start,
@@ -18,17 +72,10 @@ def streamSegments(token, stream_id, start, end, limit, offset):
         'offset': offset
     }
     path = f'/streams/{stream_id}/stream-segments'
-    url = '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
-    return _request(url, token=token)
+    return '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
 
 
-def annotations(token,
-                start,
-                end,
-                classifications=None,
-                stream=None,
-                limit=50,
-                offset=0):
+def _annotations_url(start, end, classifications, stream, limit, offset):
     data = {
         'start': start,
         'end': end,
@@ -40,18 +87,10 @@ def annotations(token,
     if (stream):
         data['stream_id'] = stream
     path = '/annotations'
-    url = '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
-    return _request(url, token=token)
+    return '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
 
 
-def detections(token,
-               start,
-               end,
-               classifications=None,
-               streams=None,
-               min_confidence=None,
-               limit=50,
-               offset=0):
+def _detections_url(start, end, classifications, streams, min_confidence, limit, offset):
     data = {
         'start': start,
         'end': end,
@@ -65,19 +104,10 @@ def detections(token,
     if (min_confidence):
         data['min_confidence'] = min_confidence
     path = '/detections'
-    url = '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
-    return _request(url, token=token)
+    return '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
 
 
-def streams(token,
-            organizations=None,
-            projects=None,
-            created_by=None,
-            keyword=None,
-            is_public=True,
-            is_deleted=False,
-            limit=1000,
-            offset=0):
+def _streams_url(organizations, projects, created_by, keyword, is_public, is_deleted, limit, offset):
     data = {
         'organizations[]': organizations,
         'projects[]': projects,
@@ -89,24 +119,47 @@ def streams(token,
         'offset': offset
     }
     path = '/streams'
-    url = '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
-    return _request(url, token=token)
+    return '{}{}?{}'.format(host, path, urllib.parse.urlencode(data, True))
+
+
+def _request(url, method='GET', token=None, session=None, cache=None, incremental=False):
+    """Perform a request and decode the JSON response
 
+    When `incremental` is set, a generator is returned instead that yields the elements of the
+    response array one at a time while it is being received (the cache is not used).
+    """
+    if incremental:
+        return _request_records(url, method, token, session)
 
-def _request(url, method='GET', token=None):
     logger.debug('get url: ' + url)
 
-    if token != None:
-        headers = {'Authorization': 'Bearer ' + token}
-    else:
-        headers = {}
+    cacheable = cache is not None and method == 'GET'
+    if cacheable:
+        content = cache.get(url)
+        if content is not None:
+            logger.debug('cache hit: ' + url)
+            return json.loads(content)
 
-    http = httplib2.Http()
-    resp, content = http.request(url, method=method, headers=headers)
+    headers = http.auth_headers(token)
+    resp = http.get_session(session).request(method, url, headers=headers)
 
-    if resp.status == http_client.OK:
-        return json.loads(content)
+    if resp.status_code == http_client.OK:
+        if cacheable:
+            cache.set(url, resp.content)
+        return resp.json()
 
-    logger.error(f'HTTP status: {resp.status}')
+    logger.error(f'HTTP status: {resp.status_code}')
 
     return None
+
+
+def _request_records(url, method='GET', token=None, session=None):
+    logger.debug('stream url: ' + url)
+
+    headers = http.auth_headers(token)
+    with http.get_session(session).request(method, url, headers=headers, stream=True) as resp:
+        if resp.status_code != http_client.OK:
+            logger.error(f'HTTP status: {resp.status_code}')
+            # An empty generator would look like the end of the results
+            raise paging.PageError('HTTP status {} for {}'.format(resp.status_code, url))
+        yield from json_stream.iter_json_array(resp.iter_content(CHUNK_SIZE), resp.encoding or 'utf-8')
@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import sqlite3
+import threading
+import time
+from six.moves import urllib
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResponseCache(object):
+    """Persistent cache of RFCx API responses
+
+    Responses are stored in a SQLite file, keyed by the normalized request url and the identity of
+    the user making the request. Queries over a time range that ended more than `historical_age`
+    ago will not change anymore and are kept for `historical_ttl`, all other queries only for
+    `recent_ttl`. When the cache grows above `max_bytes` the least recently used responses are
+    evicted.
+
+    Args:
+        path: (optional, default='.rfcx_cache') Location of the cache file.
+        max_bytes: (optional, default=512MB) Maximum total size of the cached responses.
+        recent_ttl: (optional, default=5 minutes) Lifetime of responses for recent or open time ranges.
+        historical_ttl: (optional, default=30 days) Lifetime of responses for closed historical time ranges.
+        historical_age: (optional, default=2 days) How long ago a time range must have ended to be historical.
+    """
+    def __init__(self,
+                 path='.rfcx_cache',
+                 max_bytes=DEFAULT_MAX_BYTES,
+                 recent_ttl=datetime.timedelta(minutes=5),
+                 historical_ttl=datetime.timedelta(days=30),
+                 historical_age=datetime.timedelta(days=2)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent_ttl = recent_ttl
+        self.historical_ttl = historical_ttl
+        self.historical_age = historical_age
+        self.identity = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._hit_bytes = 0
+        self._evictions = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB, '
+                         'size INTEGER, expires REAL, accessed REAL)')
+        self._db.commit()
+
+    def get(self, url):
+        """Return the cached response body for `url` or None"""
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT body, expires FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._db.commit()
+                self._misses = self._misses + 1
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self._db.commit()
+            self._hits = self._hits + 1
+            self._hit_bytes = self._hit_bytes + len(row[0])
+            return bytes(row[0])
+
+    def set(self, url, body):
+        """Store the response `body` for `url`"""
+        if len(body) > self.max_bytes:
+            return
+        key = self._key(url)
+        now = time.time()
+        expires = now + self._ttl(url).total_seconds()
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO responses (key, body, size, expires, accessed) '
+                             'VALUES (?, ?, ?, ?, ?)', (key, sqlite3.Binary(body), len(body), expires, now))
+            self._evict()
+            self._db.commit()
+
+    def clear(self):
+        """Remove all the cached responses"""
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._db.commit()
+
+    def stats(self):
+        """Return the hit and miss counts and byte totals of the cache"""
+        with self._lock:
+            entries, size = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_bytes': self._hit_bytes,
+                'entries': entries,
+                'bytes': size,
+                'evictions': self._evictions
+            }
+
+    def _evict(self):
+        size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        expired = self._db.execute('DELETE FROM responses WHERE expires < ?', (time.time(),)).rowcount
+        self._evictions = self._evictions + expired
+        size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        rows = self._db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        for key, entry_size in rows:
+            if size <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            size = size - entry_size
+            self._evictions = self._evictions + 1
+
+    def _key(self, url):
+        parts = urllib.parse.urlsplit(url)
+        query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+        normalized = urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+        return hashlib.sha256('{}\n{}'.format(self.identity, normalized).encode('utf-8')).hexdigest()
+
+    def _ttl(self, url):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        end = query.get('end')
+        if not end:
+            return self.recent_ttl
+        try:
+            end_time = datetime.datetime.fromisoformat(end[0].replace('Z', ''))
+        except ValueError:
+            return self.recent_ttl
+        if end_time.tzinfo is not None:
+            end_time = end_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        if end_time < datetime.datetime.utcnow() - self.historical_age:
+            return self.historical_ttl
+        return self.recent_ttl
@@ -0,0 +1,177 @@
+import concurrent.futures
+import threading
+import time
+
+THROTTLE_STATUSES = frozenset([429, 503])
+WAIT_INTERVAL = 0.5
+
+
+class CancellationToken(object):
+    """Cooperative cancellation of a job, e.g. a large download
+
+    Work that has not started yet is skipped and work in progress stops at the next chunk once the
+    token is cancelled, either explicitly with `cancel()` or when the `deadline` has passed.
+
+    Args:
+        deadline: (optional, default=None) Maximum duration of the job in seconds, starting now.
+    """
+    def __init__(self, deadline=None):
+        self._deadline = time.monotonic() + deadline if deadline is not None else None
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self._deadline is not None and time.monotonic() >= self._deadline:
+            self._event.set()
+        return self._event.is_set()
+
+    @property
+    def reason(self):
+        """Why the job was cancelled (None if it was not)"""
+        if not self.cancelled:
+            return None
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return 'Deadline exceeded'
+        return 'Cancelled'
+
+
+def wait_all(futures, cancel):
+    """Wait for `futures` to complete, cancelling `cancel` on Ctrl-C
+
+    On KeyboardInterrupt the tasks are given the chance to stop (queued tasks are expected to return
+    straight away once `cancel` is cancelled) before the interrupt is raised again.
+    """
+    try:
+        while concurrent.futures.wait(futures, timeout=WAIT_INTERVAL)[1]:
+            pass
+    except KeyboardInterrupt:
+        cancel.cancel()
+        concurrent.futures.wait(futures)
+        raise
+
+
+def is_congestion(status):
+    """Whether a failure with HTTP `status` is a sign of an overloaded server or network
+
+    Failures without a response (connection errors, timeouts), server errors and throttling are.
+    Other statuses (e.g. 404) and failures of a successful response (e.g. an incomplete body) are not.
+    """
+    return status is None or status == 429 or status >= 500
+
+
+class AdaptiveLimiter(object):
+    """Limit the number of tasks in flight, tuning the limit with additive increase, multiplicative decrease
+
+    The limit starts low and doubles every round trip (slow start) until the first sign of
+    congestion. After that it grows by one per round trip of successful tasks. It is cut by
+    `decrease_factor` when a task fails transiently (see `is_congestion`), the server throttles
+    (429/503) or the average latency rises above `latency_tolerance` times the best latency seen,
+    at most once per round trip. Permanent failures (e.g. a 404 for missing media) say nothing
+    about the load of the server so they leave the limit as it is.
+
+    Args:
+        min_limit: (optional, default=1) Lower bound on the number of tasks in flight.
+        max_limit: (optional, default=100) Upper bound on the number of tasks in flight.
+        initial_limit: (optional, default=4) Number of tasks in flight at the start.
+        decrease_factor: (optional, default=0.5) Factor applied to the limit on congestion.
+        latency_tolerance: (optional, default=2.0) Latency increase (relative to the best) treated as congestion.
+    """
+    def __init__(self, min_limit=1, max_limit=100, initial_limit=4, decrease_factor=0.5, latency_tolerance=2.0):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError('Require 1 <= min_limit <= max_limit')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min(max_limit, max(min_limit, initial_limit)))
+        self._in_flight = 0
+        self._slow_start = True
+        self._latency = None
+        self._best_latency = None
+        self._last_decrease = 0
+        self._started = time.monotonic()
+        self._completed = 0
+        self._failed = 0
+        self._throttled = 0
+        self._bytes = 0
+        self._limit_total = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait until a task can start"""
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight = self._in_flight + 1
+
+    def release(self, latency, nbytes=0, failed=False, status=None):
+        """Record the outcome of a task started with `acquire`
+
+        Args:
+            latency: Duration of the task in seconds.
+            nbytes: (optional, default=0) Number of bytes transferred.
+            failed: (optional, default=False) Whether the task failed.
+            status: (optional, default=None) HTTP status of a failed task, None if no response was received.
+        """
+        with self._cond:
+            self._in_flight = self._in_flight - 1
+            self._completed = self._completed + 1
+            self._limit_total = self._limit_total + self.limit
+            if failed:
+                self._failed = self._failed + 1
+                if is_congestion(status):
+                    self._decrease()
+            else:
+                self._bytes = self._bytes + nbytes
+                self._observe_latency(latency)
+                if self._latency > self.latency_tolerance * self._best_latency:
+                    self._decrease()
+                elif self._slow_start:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def throttled(self):
+        """Record that the server asked to slow down"""
+        with self._cond:
+            self._throttled = self._throttled + 1
+            self._decrease()
+
+    def response_hook(self, response, *args, **kwargs):
+        """`requests` response hook reporting throttling responses to the limiter"""
+        if response.status_code in THROTTLE_STATUSES:
+            self.throttled()
+
+    def stats(self):
+        """Return the settled concurrency and the observed throughput and errors"""
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            return {
+                'concurrency': int(self.limit),
+                'average_concurrency': self._limit_total / self._completed if self._completed else self.limit,
+                'completed': self._completed,
+                'failed': self._failed,
+                'throttled': self._throttled,
+                'bytes_per_second': self._bytes / elapsed if elapsed > 0 else 0
+            }
+
+    def _observe_latency(self, latency):
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        else:
+            # Slowly forget the best latency so a permanently slower network is not mistaken for congestion
+            self._best_latency = self._best_latency * 1.001
+
+    def _decrease(self):
+        # Tasks in flight when congestion starts all report it, only react once per round trip
+        now = time.monotonic()
+        if self._latency is not None and now - self._last_decrease < self._latency:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
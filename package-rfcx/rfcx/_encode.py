@@ -0,0 +1,38 @@
+import os
+import time
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+FLAC_SUBTYPES = ('PCM_S8', 'PCM_16', 'PCM_24')
+BLOCK_FRAMES = 64 * 1024
+
+
+def check_available():
+    """Raise ImportError if the FLAC encoder is not installed"""
+    if soundfile is None:
+        raise ImportError('Compressing audio requires soundfile. Install it with `pip install rfcx[flac]`')
+
+
+def encode_flac(wav_path, flac_path):
+    """Losslessly encode a wav file to FLAC, one block of frames at a time
+
+    Runs in a separate process when used from a process pool, so it only takes picklable arguments.
+
+    Returns:
+        Tuple of the original size, the encoded size and the seconds it took. The encoded size is None
+        when the wav file cannot be stored losslessly as FLAC (e.g. floating point samples).
+    """
+    started = time.monotonic()
+    original_bytes = os.path.getsize(wav_path)
+    with soundfile.SoundFile(wav_path) as source:
+        if source.subtype not in FLAC_SUBTYPES:
+            return original_bytes, None, time.monotonic() - started
+        with soundfile.SoundFile(flac_path, 'w', source.samplerate, source.channels, source.subtype,
+                                 format='FLAC') as destination:
+            dtype = 'int16' if source.subtype != 'PCM_24' else 'int32'
+            for block in source.blocks(BLOCK_FRAMES, dtype=dtype):
+                destination.write(block)
+    return original_bytes, os.path.getsize(flac_path), time.monotonic() - started
@@ -0,0 +1,133 @@
+import numpy as np
+
+FORMATS = ('pandas', 'arrow')
+
+
+class _DatetimeColumn(object):
+    """ISO 8601 timestamps (in UTC) stored as datetime64[ms]"""
+    def __init__(self):
+        self.chunks = []
+
+    def append(self, values):
+        # numpy parses ISO 8601 but not the trailing `Z`
+        self.chunks.append(np.array([v[:-1] if v and v.endswith('Z') else v for v in values],
+                                    dtype='datetime64[ms]'))
+
+    def to_numpy(self):
+        return np.concatenate(self.chunks) if self.chunks else np.array([], dtype='datetime64[ms]')
+
+    def to_pandas(self, pd):
+        return self.to_numpy()
+
+    def to_arrow(self, pa):
+        return pa.array(self.to_numpy())
+
+
+class _Float32Column(object):
+    def __init__(self):
+        self.chunks = []
+
+    def append(self, values):
+        self.chunks.append(np.array([np.nan if v is None else v for v in values], dtype=np.float32))
+
+    def to_numpy(self):
+        return np.concatenate(self.chunks) if self.chunks else np.array([], dtype=np.float32)
+
+    def to_pandas(self, pd):
+        return self.to_numpy()
+
+    def to_arrow(self, pa):
+        return pa.array(self.to_numpy())
+
+
+class _CategoryColumn(object):
+    """Repeated values stored once, with an int32 code per row (-1 for missing values)"""
+    def __init__(self):
+        self.chunks = []
+        self.categories = {}
+
+    def append(self, values):
+        codes = self.categories
+        self.chunks.append(np.array([-1 if v is None else codes.setdefault(v, len(codes)) for v in values],
+                                    dtype=np.int32))
+
+    def to_numpy(self):
+        return np.concatenate(self.chunks) if self.chunks else np.array([], dtype=np.int32)
+
+    def to_pandas(self, pd):
+        return pd.Categorical.from_codes(self.to_numpy(), list(self.categories))
+
+    def to_arrow(self, pa):
+        codes = self.to_numpy()
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(list(self.categories)))
+
+
+class _ObjectColumn(object):
+    def __init__(self):
+        self.values = []
+
+    def append(self, values):
+        self.values.extend(values)
+
+    def to_pandas(self, pd):
+        return np.array(self.values, dtype=object)
+
+    def to_arrow(self, pa):
+        return pa.array(self.values)
+
+
+def _stream_id(record):
+    return record.get('stream_id') or (record.get('stream') or {}).get('id')
+
+
+def _classification(record):
+    return (record.get('classification') or {}).get('value')
+
+
+DETECTION_COLUMNS = [
+    ('stream', _stream_id, _CategoryColumn),
+    ('classification', _classification, _CategoryColumn),
+    ('classifier', lambda r: r.get('classifier_id'), _CategoryColumn),
+    ('start', lambda r: r.get('start'), _DatetimeColumn),
+    ('end', lambda r: r.get('end'), _DatetimeColumn),
+    ('confidence', lambda r: r.get('confidence'), _Float32Column),
+]
+
+ANNOTATION_COLUMNS = [
+    ('id', lambda r: r.get('id'), _ObjectColumn),
+    ('stream', _stream_id, _CategoryColumn),
+    ('classification', _classification, _CategoryColumn),
+    ('start', lambda r: r.get('start'), _DatetimeColumn),
+    ('end', lambda r: r.get('end'), _DatetimeColumn),
+    ('frequency_min', lambda r: r.get('frequency_min'), _Float32Column),
+    ('frequency_max', lambda r: r.get('frequency_max'), _Float32Column),
+]
+
+
+def build_frame(pages, columns, format='pandas'):
+    """Build a table from pages of API records, converting each page to typed columns as it arrives
+
+    Args:
+        pages: Iterable of lists of records (e.g. from `rfcx._paging.iter_pages`).
+        columns: List of `(name, extract_value, column_type)`, e.g. `DETECTION_COLUMNS`.
+        format: (optional, default='pandas') Either `pandas` (returns a DataFrame) or `arrow` (returns a pyarrow Table).
+
+    Raises:
+        ImportError: if the library for `format` is not installed.
+        ValueError: if the format is not supported.
+    """
+    if format not in FORMATS:
+        raise ValueError('format should be one of: {}'.format(', '.join(FORMATS)))
+    if format == 'pandas':
+        import pandas as lib
+    else:
+        import pyarrow as lib
+
+    builders = [(name, extract, column_type()) for name, extract, column_type in columns]
+    for page in pages:
+        for name, extract, builder in builders:
+            builder.append([extract(record) for record in page])
+
+    if format == 'pandas':
+        return lib.DataFrame({name: builder.to_pandas(lib) for name, _, builder in builders})
+    return lib.table({name: builder.to_arrow(lib) for name, _, builder in builders})
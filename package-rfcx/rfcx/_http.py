@@ -0,0 +1,183 @@
+import datetime
+import email.utils
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 100
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+RETRY_STATUSES = frozenset([408, 429, 500, 502, 503, 504])
+# Sending these requests twice has the same effect as sending them once
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# Positional arguments of `requests.Session.request` after the method and url
+_REQUEST_ARGUMENTS = ('params', 'data', 'headers', 'cookies', 'files', 'auth', 'timeout', 'allow_redirects',
+                      'proxies', 'hooks', 'stream', 'verify', 'cert', 'json')
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+class RetryPolicy(object):
+    """When and how long to wait before retrying a failed request
+
+    Connection errors and responses with a status in `statuses` are retried with exponential
+    backoff and full jitter. A `Retry-After` header sent by the server takes precedence over the
+    computed delay.
+
+    Args:
+        max_attempts: (optional, default=5) Maximum number of attempts (including the first one).
+        backoff: (optional, default=0.5) Base delay in seconds, doubled on each attempt.
+        max_backoff: (optional, default=60) Maximum delay in seconds between attempts.
+        statuses: (optional) HTTP statuses worth retrying. Defaults to 408, 429, 500, 502, 503 and 504.
+        status_max_attempts: (optional) Maximum attempts for specific statuses, e.g. `{500: 2}`.
+        max_retry_after: (optional, default=300) Maximum `Retry-After` delay in seconds that is honored.
+    """
+    def __init__(self,
+                 max_attempts=5,
+                 backoff=0.5,
+                 max_backoff=60,
+                 statuses=RETRY_STATUSES,
+                 status_max_attempts=None,
+                 max_retry_after=300):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.status_max_attempts = dict(status_max_attempts or {})
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, attempt, status=None):
+        """Should a request that failed on `attempt` (with `status`, None for a connection error) be retried"""
+        if status is None:
+            return attempt < self.max_attempts
+        if status not in self.statuses:
+            return False
+        return attempt < self.status_max_attempts.get(status, self.max_attempts)
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait after `attempt` failed"""
+        if retry_after:
+            seconds = _parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class Session(requests.Session):
+    """`requests.Session` that retries failed requests according to its `retry` policy
+
+    Requests that do not set a `timeout` use the `timeout` of the session, a `(connect, read)` tuple
+    in seconds. The read timeout applies to every read of the response, so a connection that stops
+    sending data fails (and is retried) instead of blocking forever.
+
+    Only idempotent methods (GET, HEAD, OPTIONS, PUT and DELETE) are retried: a POST that failed may
+    have been processed by the server anyway. Pass `idempotent=True` to retry a request that is safe
+    to send twice, or `idempotent=False` to never retry it.
+    """
+    def __init__(self, retry=None, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+        super(Session, self).__init__()
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.timeout = timeout
+
+    def request(self, method, url, *args, idempotent=None, **kwargs):
+        # Name the positional arguments of `requests.Session.request` so the timeout and body are found
+        kwargs.update(zip(_REQUEST_ARGUMENTS, args))
+        kwargs.setdefault('timeout', self.timeout)
+        data = kwargs.get('data')
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        # A body that is being streamed from an iterator cannot be sent twice
+        replayable = idempotent and (data is None or isinstance(data, (bytes, str, dict, list, tuple))
+                                     or hasattr(data, 'seek'))
+        attempt = 0
+        while True:
+            attempt = attempt + 1
+            if attempt > 1 and hasattr(data, 'seek'):
+                data.seek(0)
+            try:
+                resp = super(Session, self).request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not (replayable and self.retry.should_retry(attempt)):
+                    raise
+                delay = self.retry.delay(attempt)
+                logger.warning('%s %s failed (%s), retrying in %.1fs', method, url, e, delay)
+            else:
+                if not (replayable and self.retry.should_retry(attempt, resp.status_code)):
+                    return resp
+                delay = self.retry.delay(attempt, resp.headers.get('Retry-After'))
+                logger.warning('%s %s returned %s, retrying in %.1fs', method, url, resp.status_code, delay)
+                resp.close()
+            time.sleep(delay)
+
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   retry=None,
+                   timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+    """Create a keep-alive session for talking to the RFCx services
+
+    Args:
+        pool_connections: Number of hosts to keep a connection pool for.
+        pool_maxsize: Maximum number of connections kept alive per host. Should be at
+            least the number of worker threads sharing the session.
+        retry: `RetryPolicy` for failed requests. Defaults to `RetryPolicy()`.
+        timeout: `(connect, read)` timeouts in seconds of requests that do not set their own.
+
+    Returns:
+        A `Session` whose connections are reused across calls and threads.
+    """
+    session = Session(retry, timeout)
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(session=None):
+    """Return `session` if given, otherwise the module wide default session"""
+    global _default_session
+    if session is not None:
+        return session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+
+def auth_headers(token, headers=None):
+    """Add the bearer `token` (when there is one) to a copy of `headers`
+
+    `token` can also be a function returning the token (e.g. a `TokenProvider`), which is called
+    every time so that long running jobs pick up refreshed tokens.
+    """
+    headers = dict(headers) if headers else {}
+    if callable(token):
+        token = token()
+    if token is not None:
+        headers['Authorization'] = 'Bearer ' + token
+    return headers
+
+
+def _parse_retry_after(value):
+    """Seconds to wait from a `Retry-After` header (either seconds or an HTTP date)"""
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max(0, (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
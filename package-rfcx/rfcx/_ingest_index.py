@@ -0,0 +1,70 @@
+import datetime
+import hashlib
+import sqlite3
+import threading
+
+UPLOADED = 'uploaded'
+INGESTED = 'ingested'
+FAILED = 'failed'
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class IngestIndex(object):
+    """Local record of the audio files uploaded to each stream, keyed by their content
+
+    A file is identified by the sha256 of its content, the stream and the timestamp it was
+    ingested with, so renamed or copied files are recognised while the same recording can still
+    be ingested to another stream or at another time.
+
+    Args:
+        path: (optional, default='.rfcx_ingest') Location of the SQLite index file.
+    """
+    def __init__(self, path='.rfcx_ingest'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS files (hash TEXT, stream TEXT, timestamp TEXT, path TEXT, '
+                         'upload_id TEXT, status TEXT, updated_at TEXT, PRIMARY KEY (hash, stream, timestamp))')
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def is_ingested(self, digest, stream, timestamp):
+        """Whether the file with content hash `digest` was already ingested successfully"""
+        with self._lock:
+            row = self._db.execute('SELECT status FROM files WHERE hash = ? AND stream = ? AND timestamp = ?',
+                                   (digest, stream, timestamp)).fetchone()
+        return row is not None and row[0] == INGESTED
+
+    def mark(self, digest, stream, timestamp, path, upload_id, status):
+        """Record the upload of a file and its `status` (`uploaded`, `ingested` or `failed`)"""
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO files (hash, stream, timestamp, path, upload_id, status, '
+                             'updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (digest, stream, timestamp, path, upload_id, status, _now()))
+            self._db.commit()
+
+    def counts(self, stream):
+        """Number of files of `stream` per status"""
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM files WHERE stream = ? GROUP BY status',
+                                    (stream,)).fetchall()
+        return dict(rows)
+
+
+def file_digest(filepath, block_size=HASH_BLOCK_SIZE):
+    """Hex sha256 of the content of a file, read one block at a time
+
+    hashlib releases the GIL while hashing large blocks, so several files can be hashed in parallel threads.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _now():
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + 'Z'
@@ -0,0 +1,139 @@
+import concurrent.futures
+import heapq
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = frozenset([0, 10])
+
+DEFAULT_INITIAL_DELAY = 2
+DEFAULT_MAX_DELAY = 60
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_ERRORS = 5
+
+
+class StatusPoller(object):
+    """Track the processing status of many uploads from a single thread
+
+    Every tracked upload is polled with its own exponential backoff: after `initial_delay`, then
+    1.5 times longer each time it is still processing (up to `max_delay`). Uploads that are due at
+    the same time are polled together as one batch of concurrent requests. The future returned by
+    `track` is resolved with the status response once the upload is processed, whether it succeeded
+    or failed (`status` >= 30).
+
+    Args:
+        fetch_status: Function taking an upload id and returning its status response.
+        initial_delay: (optional, default=2) Seconds before the first poll of an upload.
+        max_delay: (optional, default=60) Maximum seconds between two polls of an upload.
+        batch_size: (optional, default=20) Maximum number of uploads polled at the same time.
+        max_errors: (optional, default=5) Consecutive errors polling an upload before giving up on it.
+    """
+    def __init__(self,
+                 fetch_status,
+                 initial_delay=DEFAULT_INITIAL_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY,
+                 batch_size=DEFAULT_BATCH_SIZE,
+                 max_errors=DEFAULT_MAX_ERRORS):
+        self.fetch_status = fetch_status
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._due = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=batch_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def track(self, upload_id, callback=None):
+        """Start tracking `upload_id`, returning a future resolved with its final status response
+
+        Args:
+            upload_id: Id returned when the upload url was generated.
+            callback: (optional, default=None) Function called with the future once it is resolved.
+        """
+        future = concurrent.futures.Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('The poller is closed')
+            self._schedule(_Item(upload_id, future), self.initial_delay)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rfcx-ingest-status', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def close(self):
+        """Wait for the tracked uploads to be resolved and stop polling"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown()
+
+    def _schedule(self, item, delay):
+        # Jitter spreads the polls of uploads that started together
+        heapq.heappush(self._due, (time.monotonic() + delay * random.uniform(0.8, 1.2), id(item), item))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._due:
+                        if self._closed:
+                            return
+                        self._cond.wait()
+                        continue
+                    wait = self._due[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                batch = []
+                while self._due and self._due[0][0] <= time.monotonic() and len(batch) < self.batch_size:
+                    batch.append(heapq.heappop(self._due)[2])
+            responses = list(self._executor.map(self._poll, batch))
+            with self._cond:
+                for item, response in zip(batch, responses):
+                    self._handle(item, response)
+
+    def _poll(self, item):
+        try:
+            return self.fetch_status(item.upload_id), None
+        except Exception as e:
+            return None, e
+
+    def _handle(self, item, response):
+        status, error = response
+        if error is None and isinstance(status, dict) and 'status' in status:
+            item.errors = 0
+            if status['status'] not in PENDING_STATUSES:
+                item.future.set_result(status)
+                return
+            item.polls = item.polls + 1
+        else:
+            item.errors = item.errors + 1
+            if item.errors >= self.max_errors:
+                item.future.set_exception(error or ValueError('Invalid status response: {}'.format(status)))
+                return
+            logger.warning('Failed to get the status of upload %s: %s', item.upload_id, error or status)
+        self._schedule(item, min(self.max_delay, self.initial_delay * 1.5 ** (item.polls + item.errors)))
+
+
+class _Item(object):
+    def __init__(self, upload_id, future):
+        self.upload_id = upload_id
+        self.future = future
+        self.polls = 0
+        self.errors = 0
@@ -0,0 +1,72 @@
+import datetime
+import sqlite3
+import threading
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class SyncJournal(object):
+    """Local record of the segments of each stream and whether they have been downloaded
+
+    Args:
+        path: Location of the SQLite journal file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS segments (id TEXT PRIMARY KEY, stream TEXT, start TEXT, '
+                         'end TEXT, status TEXT, attempts INTEGER DEFAULT 0, updated_at TEXT)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS segments_stream_status ON segments (stream, status)')
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def high_water_mark(self, stream):
+        """End of the latest segment recorded for `stream` (None if there are none)"""
+        with self._lock:
+            return self._db.execute('SELECT MAX(end) FROM segments WHERE stream = ?', (stream,)).fetchone()[0]
+
+    def add(self, segments):
+        """Record new segments as pending (segments that are already known are left untouched)
+
+        Returns:
+            Number of segments that were not known yet
+        """
+        now = _now()
+        rows = [(s['id'], s['stream']['id'], s['start'], s['end'], PENDING, now) for s in segments]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany('INSERT OR IGNORE INTO segments (id, stream, start, end, status, updated_at) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def missing(self, stream):
+        """Segments of `stream` that are pending or failed, in the format returned by `streamSegments`"""
+        with self._lock:
+            rows = self._db.execute('SELECT id, stream, start, end FROM segments WHERE stream = ? AND status != ? '
+                                    'ORDER BY start', (stream, DONE)).fetchall()
+        return [{'id': id, 'stream': {'id': stream}, 'start': start, 'end': end} for id, stream, start, end in rows]
+
+    def mark(self, segment_ids, status):
+        """Set the download `status` of the given segments"""
+        now = _now()
+        with self._lock:
+            self._db.executemany('UPDATE segments SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                                 [(status, now, id) for id in segment_ids])
+            self._db.commit()
+
+    def counts(self, stream):
+        """Number of segments of `stream` per status"""
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM segments WHERE stream = ? GROUP BY status',
+                                    (stream,)).fetchall()
+        return dict(rows)
+
+
+def _now():
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + 'Z'
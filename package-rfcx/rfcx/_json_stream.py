@@ -0,0 +1,63 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks, encoding='utf-8'):
+    """Yield the elements of a JSON array as soon as each has been received
+
+    Only the current incomplete element is held in memory, not the whole document.
+
+    Args:
+        chunks: Iterable of bytes making up a JSON document whose top level is an array.
+        encoding: (optional, default='utf-8') Encoding of the bytes.
+
+    Raises:
+        ValueError: if the document is not a well formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ''
+    started = False
+    finished = False
+    for chunk in chunks:
+        buffer = buffer + text_decoder.decode(chunk)
+        pos = 0
+        while not finished:
+            pos = _skip_whitespace(buffer, pos)
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                pos = pos + 1
+                continue
+            if buffer[pos] == ']':
+                finished = True
+                break
+            if buffer[pos] == ',':
+                pos = pos + 1
+                continue
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # The element is incomplete, wait for more data
+                break
+            # The element is only complete once it is followed by a separator: a number split by a chunk
+            # boundary (e.g. `1.` or `2e`) decodes as a prefix of itself
+            following = _skip_whitespace(buffer, end)
+            if following == len(buffer) or buffer[following] not in ',]':
+                break
+            yield element
+            pos = end
+        buffer = buffer[pos:]
+    if not finished:
+        raise ValueError('Unterminated JSON array')
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos = pos + 1
+    return pos
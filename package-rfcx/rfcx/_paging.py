@@ -0,0 +1,195 @@
+import collections
+import concurrent.futures
+import datetime
+
+MAX_PAGE_SIZE = 1000
+DEFAULT_SHARDS = 8
+MIN_SHARD_WINDOW = datetime.timedelta(seconds=1)
+
+
+class PageError(Exception):
+    """A page of results could not be retrieved (after the retries), so the results are incomplete"""
+
+
+def iter_pages(fetch_page, limit=MAX_PAGE_SIZE):
+    """Yield the pages returned by `fetch_page(limit, offset)` until the results run out
+
+    The request for the next page is started in the background while the current page is being
+    consumed. A page shorter than `limit` is the last one, so no extra request is made to find
+    out that the next page is empty.
+
+    Args:
+        fetch_page: Function taking `limit` and `offset` and returning a list (or None on error).
+        limit: (optional, default=1000) Page size.
+
+    Raises:
+        PageError: if `fetch_page` fails, rather than ending as if there were no more results.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        offset = 0
+        future = executor.submit(fetch_page, limit, offset)
+        while future is not None:
+            page = _check_page(future.result(), offset)
+            if not page:
+                return
+            future = None
+            if len(page) >= limit:
+                offset = offset + limit
+                future = executor.submit(fetch_page, limit, offset)
+            yield page
+
+
+def iter_pages_parallel(fetch_page, limit=MAX_PAGE_SIZE, initial_window=2, max_window=16):
+    """Yield the pages returned by `fetch_page(limit, offset)`, requesting several offsets at once
+
+    Requests for the next `window` offsets are kept in flight. Every full page received widens the
+    window by one page (up to `max_window`), so the requests made past the end of the results grow
+    slowly with the length of the listing rather than doubling. The first short or empty page ends
+    the listing without waiting for the requests still in flight. Pages are yielded in offset order.
+
+    Args:
+        fetch_page: Function taking `limit` and `offset` and returning a list (or None on error).
+        limit: (optional, default=1000) Page size.
+        initial_window: (optional, default=2) Number of pages requested up front.
+        max_window: (optional, default=16) Maximum number of pages requested at the same time.
+
+    Raises:
+        PageError: if `fetch_page` fails.
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_window)
+    pending = collections.deque()
+    offset = 0
+    next_offset = 0
+    window = min(initial_window, max_window)
+    try:
+        while True:
+            while len(pending) < window:
+                pending.append(executor.submit(fetch_page, limit, next_offset))
+                next_offset = next_offset + limit
+            page = _check_page(pending.popleft().result(), offset)
+            offset = offset + limit
+            if page:
+                yield page
+            if not page or len(page) < limit:
+                return
+            window = min(window + 1, max_window)
+    finally:
+        # The requests past the end of the results are of no use, let them finish in the background
+        executor.shutdown(wait=False)
+
+
+def iter_records(fetch_page, limit=MAX_PAGE_SIZE, incremental=False):
+    """Same as `iter_pages` but yields the individual records (see `iter_records_incremental` for `incremental`)"""
+    if incremental:
+        yield from iter_records_incremental(fetch_page, limit)
+        return
+    for page in iter_pages(fetch_page, limit):
+        yield from page
+
+
+def iter_records_incremental(fetch_records, limit=MAX_PAGE_SIZE):
+    """Yield the records returned by `fetch_records(limit, offset)` one page after the other
+
+    Unlike `iter_records`, pages are not prefetched: `fetch_records` is expected to yield records
+    as they are decoded, so memory use does not depend on the page size.
+    """
+    offset = 0
+    while True:
+        count = 0
+        for record in fetch_records(limit, offset):
+            count = count + 1
+            yield record
+        if count < limit:
+            return
+        offset = offset + limit
+
+
+def iter_sharded_records(fetch_window,
+                         start,
+                         end,
+                         shards=DEFAULT_SHARDS,
+                         max_workers=DEFAULT_SHARDS,
+                         limit=MAX_PAGE_SIZE,
+                         min_window=MIN_SHARD_WINDOW):
+    """Yield the records between `start` and `end`, querying time windows concurrently
+
+    `[start, end)` is split into `shards` windows that are requested at the same time. A window
+    whose first page comes back full is split in two (its page is dropped, the halves are cheaper
+    to list than paging through the offsets one after the other) until it is shorter than
+    `min_window`, after which it is paged by offset. Records are yielded as windows complete,
+    so not in time order, and records returned by more than one window are only yielded once.
+
+    Args:
+        fetch_window: Function taking `start`, `end`, `limit` and `offset` and returning a list (or None on error).
+        start: Start of the time range (ISO 8601).
+        end: End of the time range (ISO 8601).
+        shards: (optional, default=8) Number of windows the time range is initially split into.
+        max_workers: (optional, default=8) Maximum number of requests in flight.
+        limit: (optional, default=1000) Page size.
+        min_window: (optional, default=1 second) Windows shorter than this are not split any further.
+
+    Raises:
+        PageError: if `fetch_window` fails.
+    """
+    seen = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit(window_start, window_end, offset=0):
+            future = executor.submit(fetch_window, _format_time(window_start), _format_time(window_end), limit, offset)
+            pending[future] = (window_start, window_end, offset)
+
+        for window_start, window_end in _split_window(_parse_time(start), _parse_time(end), shards):
+            submit(window_start, window_end)
+        try:
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    window_start, window_end, offset = pending.pop(future)
+                    page = _check_page(future.result(), offset, window_start, window_end)
+                    if len(page) >= limit:
+                        if offset == 0 and window_end - window_start >= 2 * min_window:
+                            for half_start, half_end in _split_window(window_start, window_end, 2):
+                                submit(half_start, half_end)
+                            continue
+                        submit(window_start, window_end, offset + limit)
+                    for record in page:
+                        key = _record_key(record)
+                        if key not in seen:
+                            seen.add(key)
+                            yield record
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _check_page(page, offset, window_start=None, window_end=None):
+    if page is not None:
+        return page
+    if window_start is None:
+        raise PageError('Failed to get the results at offset {}'.format(offset))
+    raise PageError('Failed to get the results from {} to {} at offset {}'.format(
+        _format_time(window_start), _format_time(window_end), offset))
+
+
+def _split_window(start, end, count):
+    step = (end - start) / max(1, count)
+    bounds = [start + step * i for i in range(count)] + [end]
+    return [(s, e) for s, e in zip(bounds, bounds[1:]) if e > s]
+
+
+def _parse_time(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', ''))
+
+
+def _format_time(value):
+    return value.isoformat(timespec='milliseconds') + 'Z'
+
+
+def _record_key(record):
+    if record.get('id') is not None:
+        return record['id']
+    # Detections are not guaranteed to have an id
+    stream = record.get('stream_id') or (record.get('stream') or {}).get('id')
+    classification = (record.get('classification') or {}).get('value')
+    return (stream, classification, record.get('classifier_id'), record.get('start'), record.get('end'))
@@ -0,0 +1,119 @@
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+class WavFormat(object):
+    """Format of the samples in a wav file
+
+    `dtype` is the type of the decoded samples. 24-bit samples are decoded to 32-bit integers, so
+    their `sample_width` in the file (3 bytes) differs from the size of `dtype`.
+    """
+    def __init__(self, sample_rate, channels, dtype, sample_width=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = dtype
+        self.sample_width = sample_width if sample_width is not None else dtype.itemsize
+
+    @property
+    def frame_size(self):
+        return self.channels * self.sample_width
+
+
+def parse_wav_header(buffer):
+    """Find the format and the position of the samples in a wav file
+
+    Args:
+        buffer: Bytes (or buffer) starting with the wav header.
+
+    Returns:
+        Tuple of the `WavFormat`, the offset of the samples and their size in bytes (None when the
+        header does not know it, e.g. streamed audio). Returns None if the header is incomplete.
+
+    Raises:
+        ValueError: if the buffer is not a supported wav file.
+    """
+    view = memoryview(buffer)
+    if len(view) < 12:
+        return None
+    if bytes(view[:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError('Not a wav file')
+    wav_format = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        chunk_size = struct.unpack('<I', view[pos + 4:pos + 8])[0]
+        if chunk_id == b'data':
+            if wav_format is None:
+                raise ValueError('Wav data before its format')
+            return wav_format, pos + 8, None if chunk_size in _UNKNOWN_SIZES else chunk_size
+        if pos + 8 + chunk_size > len(view):
+            return None
+        if chunk_id == b'fmt ':
+            wav_format = _parse_format(view[pos + 8:pos + 8 + chunk_size])
+        # Chunks are padded to an even size
+        pos = pos + 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def decode_wav(buffer):
+    """Decode a complete wav file held in memory, without copying the samples (except 24-bit ones)
+
+    Returns:
+        Tuple of the samples (array of shape (frames,) for mono or (frames, channels)) and the sample rate
+
+    Raises:
+        ValueError: if the buffer is not a complete wav file of a supported format.
+    """
+    header = parse_wav_header(buffer)
+    if header is None:
+        raise ValueError('Incomplete wav file')
+    wav_format, offset, size = header
+    available = len(buffer) - offset
+    size = available if size is None else min(size, available)
+    frames = size // wav_format.frame_size
+    return frames_to_array(buffer, wav_format, offset, frames), wav_format.sample_rate
+
+
+def frames_to_array(buffer, wav_format, offset, frames):
+    """Array view of `frames` frames of samples starting at `offset` in `buffer`
+
+    24-bit samples have no NumPy type so they are copied into a new array of 32-bit integers.
+    """
+    count = frames * wav_format.channels
+    if wav_format.sample_width == 3:
+        samples = _int24_to_int32(np.frombuffer(buffer, dtype=np.uint8, count=count * 3, offset=offset))
+    else:
+        samples = np.frombuffer(buffer, dtype=wav_format.dtype, count=count, offset=offset)
+    if wav_format.channels > 1:
+        samples = samples.reshape(frames, wav_format.channels)
+    return samples
+
+
+def _parse_format(chunk):
+    audio_format, channels, sample_rate = struct.unpack('<HHI', chunk[:8])
+    bits = struct.unpack('<H', chunk[14:16])[0]
+    if audio_format == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+        audio_format = struct.unpack('<H', chunk[24:26])[0]
+    if audio_format == WAVE_FORMAT_PCM and bits == 24:
+        return WavFormat(sample_rate, channels, np.dtype('<i4'), sample_width=3)
+    if audio_format == WAVE_FORMAT_PCM and bits in (8, 16, 32):
+        dtype = {8: np.uint8, 16: np.int16, 32: np.int32}[bits]
+    elif audio_format == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        dtype = {32: np.float32, 64: np.float64}[bits]
+    else:
+        raise ValueError('Unsupported wav format {} with {} bits per sample'.format(audio_format, bits))
+    return WavFormat(sample_rate, channels, np.dtype(dtype).newbyteorder('<'))
+
+
+def _int24_to_int32(raw):
+    """Little endian 24-bit samples (as bytes) to 32-bit integers with the same values"""
+    padded = np.zeros((len(raw) // 3, 4), dtype=np.uint8)
+    # Put the 3 bytes in the high bytes so that the sign is kept, then shift back down
+    padded[:, 1:] = raw.reshape(-1, 3)
+    return padded.view('<i4').reshape(-1) >> 8
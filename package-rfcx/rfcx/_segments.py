@@ -0,0 +1,135 @@
+import numpy as np
+
+_TIME_UNIT = 'ms'
+_MAX_DIGITS = 3
+
+
+class SegmentTable(object):
+    """Stream segments stored as columns rather than a list of dicts
+
+    Ids and stream ids are kept in fixed width string arrays and start/end times as datetime64,
+    which takes a fraction of the memory of the records returned by `streamSegments` and lets
+    media urls and file names be generated for all the segments at once.
+
+    Indexing or iterating returns segments in the `streamSegments` format, so a table can be used
+    wherever a list of segments is expected.
+
+    Times are stored to the millisecond, the precision of the API. The number of fractional digits
+    of each time string is kept too, so times are formatted back (in media urls, file names and
+    segments) exactly as the API returned them, e.g. `2020-01-01T00:01:00Z` stays without milliseconds.
+
+    Args:
+        ids: Segment ids.
+        streams: Stream id of each segment.
+        starts: Start time of each segment (ISO 8601 strings or datetime64).
+        ends: End time of each segment (ISO 8601 strings or datetime64).
+        start_digits: (optional, default=None) Fractional second digits of each start time. Defaults
+            to those of the strings, 3 for datetime64.
+        end_digits: (optional, default=None) Fractional second digits of each end time.
+    """
+    def __init__(self, ids, streams, starts, ends, start_digits=None, end_digits=None):
+        self.ids = np.asarray(ids, dtype=str)
+        self.streams = np.asarray(streams, dtype=str)
+        self.starts, self.start_digits = _to_datetime64(starts, start_digits)
+        self.ends, self.end_digits = _to_datetime64(ends, end_digits)
+        if not len(self.ids) == len(self.streams) == len(self.starts) == len(self.ends):
+            raise ValueError('All columns should have the same length')
+
+    @classmethod
+    def from_records(cls, segments):
+        """Create a table from a list of segments in the `streamSegments` format"""
+        if isinstance(segments, cls):
+            return segments
+        segments = list(segments)
+        return cls([s['id'] for s in segments], [s['stream']['id'] for s in segments],
+                   [s['start'] for s in segments], [s['end'] for s in segments])
+
+    @classmethod
+    def from_pages(cls, pages):
+        """Create a table from pages of segments, converting each page as it arrives
+
+        Segments returned more than once (e.g. when segments are added while listing) are only kept once.
+        """
+        tables = [cls.from_records(page) for page in pages if page]
+        if not tables:
+            return cls([], [], [], [])
+        table = cls(np.concatenate([t.ids for t in tables]), np.concatenate([t.streams for t in tables]),
+                    np.concatenate([t.starts for t in tables]), np.concatenate([t.ends for t in tables]),
+                    np.concatenate([t.start_digits for t in tables]), np.concatenate([t.end_digits for t in tables]))
+        _, first = np.unique(table.ids, return_index=True)
+        if len(first) < len(table):
+            table = table[np.sort(first)]
+        return table
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return {'id': str(self.ids[index]), 'stream': {'id': str(self.streams[index])},
+                    'start': str(_format_times(self.starts[index:index + 1], self.start_digits[index:index + 1])[0]),
+                    'end': str(_format_times(self.ends[index:index + 1], self.end_digits[index:index + 1])[0])}
+        return SegmentTable(self.ids[index], self.streams[index], self.starts[index], self.ends[index],
+                            self.start_digits[index], self.end_digits[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def urls_and_paths(self, media_host, save_path, gain=1, file_ext='wav'):
+        """Media api urls and local paths of all the segments
+
+        Same as formatting each segment with `rfcx.audio.iso_to_rfcx_custom_format`, e.g.
+        `{media_host}/internal/assets/streams/{stream}_t{start}.{end}_rfull_g{gain}_f{ext}.{ext}`
+        and `{save_path}/{stream}_{start}_{id}_gain{gain}.{ext}`.
+
+        Returns:
+            Tuple of two string arrays, the urls and the local paths
+        """
+        start = _rfcx_custom_format(self.starts, self.start_digits)
+        end = _rfcx_custom_format(self.ends, self.end_digits)
+        rfcx_audio_format = _concat(self.streams, '_t', start, '.', end, '_rfull_g{}_f{}'.format(gain, file_ext))
+        urls = _concat(media_host + '/internal/assets/streams/', rfcx_audio_format, '.' + file_ext)
+        paths = _concat(save_path + '/', self.streams, '_', start, '_', self.ids, '_gain{}.{}'.format(gain, file_ext))
+        return urls, paths
+
+
+def _to_datetime64(values, digits=None):
+    """Times as datetime64 and the number of fractional second digits of each"""
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+        times = values.astype('datetime64[{}]'.format(_TIME_UNIT))
+    else:
+        # numpy parses ISO 8601 but not the trailing `Z`
+        values = [v[:-1] if v.endswith('Z') else v for v in values]
+        times = np.array(values, dtype='datetime64[{}]'.format(_TIME_UNIT))
+        if digits is None:
+            digits = [len(v) - v.index('.') - 1 if '.' in v else 0 for v in values]
+    if digits is None:
+        digits = np.full(len(times), _MAX_DIGITS)
+    return times, np.minimum(np.asarray(digits, dtype=np.int8), _MAX_DIGITS)
+
+
+def _format_times(times, digits):
+    """ISO 8601 strings of `times`, each with its number of fractional second `digits`"""
+    # e.g. 2020-01-01T00:01:00.000, cut to 19 characters without fraction or 20 + digits with
+    text = np.datetime_as_string(times, unit=_TIME_UNIT)
+    for count in np.unique(digits):
+        if count < _MAX_DIGITS:
+            selected = digits == count
+            text[selected] = text[selected].astype('U{}'.format(20 + count if count else 19))
+    return np.char.add(text, 'Z')
+
+
+def _rfcx_custom_format(times, digits):
+    """Vectorized `rfcx.audio.iso_to_rfcx_custom_format`, e.g. 20200101T000100000Z"""
+    text = _format_times(times, digits)
+    for character in '-:.':
+        text = np.char.replace(text, character, '')
+    return text
+
+
+def _concat(*parts):
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
@@ -0,0 +1,89 @@
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_MARGIN = datetime.timedelta(minutes=10)
+FAILED_REFRESH_DELAY = datetime.timedelta(seconds=30)
+
+
+class TokenProvider(object):
+    """Callable returning the current id token, refreshed before it expires
+
+    A background thread refreshes the credentials `margin` before their `token_expiry`. Callers
+    that find the token about to expire (e.g. the thread fell behind) refresh it themselves, under
+    a lock so that only one of many worker threads calls the auth endpoint and the others reuse its
+    result. Workers read the token for every request, so a long job carries on with the new token.
+
+    Args:
+        get_credentials: Function returning the current `Credentials` (or None before authenticating).
+        refresh: Function refreshing the credentials, so that `get_credentials` returns the new ones.
+        margin: (optional, default=10 minutes) How long before the expiry the token is refreshed.
+    """
+    def __init__(self, get_credentials, refresh, margin=DEFAULT_REFRESH_MARGIN):
+        self._get_credentials = get_credentials
+        self._refresh = refresh
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._retry_at = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __call__(self):
+        credentials = self._get_credentials()
+        if self._needs_refresh(credentials):
+            with self._lock:
+                credentials = self._get_credentials()
+                # Another thread may have refreshed while this one was waiting for the lock
+                if self._needs_refresh(credentials):
+                    self._refresh_now()
+                    credentials = self._get_credentials()
+        return credentials.id_token if credentials is not None else None
+
+    def start(self):
+        """Start refreshing in the background (does nothing if already started)"""
+        if self._thread is not None and self._thread.is_alive() and not self._stopped.is_set():
+            return
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stopped,), name='rfcx-token-refresh',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop refreshing in the background"""
+        self._stopped.set()
+
+    def _run(self, stopped):
+        while True:
+            delay = self._seconds_until_refresh()
+            if delay is None or stopped.wait(delay):
+                return
+            self()
+
+    def _seconds_until_refresh(self):
+        credentials = self._get_credentials()
+        if credentials is None or not credentials.refresh_token or credentials.token_expiry is None:
+            return None
+        refresh_at = credentials.token_expiry - self.margin
+        if self._retry_at is not None:
+            refresh_at = max(refresh_at, self._retry_at)
+        return max(1, (refresh_at - datetime.datetime.utcnow()).total_seconds())
+
+    def _needs_refresh(self, credentials):
+        if credentials is None or not credentials.refresh_token or credentials.token_expiry is None:
+            return False
+        now = datetime.datetime.utcnow()
+        if self._retry_at is not None and now < self._retry_at:
+            return False
+        return now >= credentials.token_expiry - self.margin
+
+    def _refresh_now(self):
+        try:
+            self._refresh()
+            self._retry_at = None
+            logger.info('Refreshed the access token')
+        except Exception as e:
+            # Keep using the current token (it may still be valid) and try again later
+            self._retry_at = datetime.datetime.utcnow() + FAILED_REFRESH_DELAY
+            logger.warning('Failed to refresh the access token: %s', e)
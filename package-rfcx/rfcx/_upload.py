@@ -0,0 +1,164 @@
+import io
+import logging
+import os
+import re
+import requests
+from six.moves import urllib
+import rfcx._http as http
+
+logger = logging.getLogger(__name__)
+
+# Resumable uploads require chunks in multiples of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 32 * CHUNK_ALIGNMENT
+MAX_RESUMES = 5
+
+RESUME_INCOMPLETE = 308
+
+
+class ProgressReader(io.RawIOBase):
+    """Read-only view of `length` bytes of a file from `start`, reporting progress as it is read
+
+    The data is read from the file in blocks as the request is sent, so memory use does not depend
+    on the size of the file. Seeking back (e.g. when a request is retried) rewinds the progress too.
+
+    Args:
+        file: File opened in binary mode.
+        start: Offset of the first byte.
+        length: Number of bytes.
+        progress: (optional, default=None) Function called with the number of bytes sent so far.
+        sent_before: (optional, default=0) Bytes of the upload sent before `start`, included in the progress.
+    """
+    def __init__(self, file, start, length, progress=None, sent_before=0):
+        self._file = file
+        self._start = start
+        self._length = length
+        self._pos = 0
+        self._progress = progress
+        self._sent_before = sent_before
+
+    def __len__(self):
+        return self._length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset = self._pos + offset
+        elif whence == io.SEEK_END:
+            offset = self._length + offset
+        self._pos = max(0, min(offset, self._length))
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._length - self._pos:
+            size = self._length - self._pos
+        self._file.seek(self._start + self._pos)
+        data = self._file.read(size)
+        self._pos = self._pos + len(data)
+        if self._progress is not None and data:
+            self._progress(self._sent_before + self._pos)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def is_resumable(signed_url):
+    """Whether `signed_url` is a resumable upload session (Google Cloud Storage `upload_id`)"""
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(signed_url).query)
+    return 'upload_id' in query
+
+
+def upload_file(signed_url, filepath, content_type, session=None, progress=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Upload a file to a signed url, streaming it from disk
+
+    Resumable upload sessions are sent in chunks of `chunk_size` bytes with `Content-Range`: a chunk
+    that fails is retried on its own, and after repeated failures the upload resumes from the last
+    byte the server received. Other urls (e.g. S3 presigned urls, which only accept the whole
+    object in one request) are sent with a single streamed PUT, which is retried from the start.
+
+    Args:
+        signed_url: Upload url.
+        filepath: Local file path.
+        content_type: Content type of the file.
+        session: (optional, default=None) Session to upload with.
+        progress: (optional, default=None) Function called with the bytes sent so far and the total.
+
+    Returns:
+        The final response (None if the upload could not be completed)
+    """
+    session = http.get_session(session)
+    total = os.path.getsize(filepath)
+    report = (lambda sent: progress(sent, total)) if progress is not None else None
+    with open(filepath, 'rb') as file:
+        if not is_resumable(signed_url):
+            headers = {'Content-Type': content_type, 'Content-Length': str(total)}
+            return session.put(signed_url, data=ProgressReader(file, 0, total, report), headers=headers,
+                               allow_redirects=False)
+        return _upload_resumable(session, signed_url, file, total, content_type, report,
+                                 max(CHUNK_ALIGNMENT, chunk_size - chunk_size % CHUNK_ALIGNMENT))
+
+
+def _upload_resumable(session, signed_url, file, total, content_type, report, chunk_size):
+    offset = 0
+    failures = 0
+    while True:
+        length = min(chunk_size, total - offset)
+        resp = _send_chunk(session, signed_url, file, offset, length, total, content_type, report)
+        if resp is not None and resp.status_code in (200, 201):
+            return resp
+        if resp is not None and resp.status_code == RESUME_INCOMPLETE:
+            # The server tells which bytes it has (possibly fewer than sent), carry on from there
+            persisted = _persisted_bytes(resp)
+            failures = 0 if persisted > offset else failures + 1
+        elif resp is not None and resp.status_code < 500 and resp.status_code not in http.RETRY_STATUSES:
+            return resp
+        else:
+            # The chunk kept failing, ask the server how much it has and carry on from there
+            failures = failures + 1
+            if failures > MAX_RESUMES:
+                return resp
+            status = _send_chunk(session, signed_url, file, total, 0, total, content_type, report)
+            if status is None or status.status_code in (200, 201):
+                return status or resp
+            if status.status_code != RESUME_INCOMPLETE:
+                return resp
+            persisted = _persisted_bytes(status)
+        if failures > MAX_RESUMES:
+            return resp
+        offset = persisted
+
+
+def _send_chunk(session, signed_url, file, offset, length, total, content_type, report):
+    """PUT `length` bytes from `offset`, or ask for the upload status when `length` is 0 (None on error)"""
+    if length == 0 and total > 0:
+        # Also completes an upload whose bytes were all received
+        headers = {'Content-Range': 'bytes */{}'.format(total), 'Content-Length': '0'}
+        data = None
+    else:
+        headers = {'Content-Type': content_type, 'Content-Length': str(length)}
+        if total > 0:
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(offset, offset + length - 1, total)
+        data = ProgressReader(file, offset, length, report, offset)
+    try:
+        return session.put(signed_url, data=data, headers=headers, allow_redirects=False)
+    except requests.RequestException as e:
+        logger.warning('Upload of %s bytes at %d failed: %s', length, offset, e)
+        return None
+
+
+def _persisted_bytes(resp):
+    """Number of bytes the server has according to the `Range` header of a 308 response"""
+    # Without a `Range` header the server has not persisted any byte yet
+    match = re.match(r'bytes=0-(\d+)', resp.headers.get('Range', ''))
+    return int(match.group(1)) + 1 if match else 0
@@ -0,0 +1,333 @@
+import asyncio
+import datetime
+import logging
+import os
+import rfcx.audio as audio
+import rfcx.ingest as ingest
+import rfcx._util as util
+import rfcx._http as http
+import rfcx._paging as paging
+import rfcx._api_rfcx as api_rfcx
+from rfcx._segments import SegmentTable
+from rfcx.client import Client
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncClient(object):
+    """Perform requests against the RFCx platform from asyncio code
+
+    Offers the same queries, downloads and ingest as `rfcx.Client` as coroutines. Authentication
+    is delegated to a (synchronous) `rfcx.Client` so persisted credentials are shared between both.
+    Requires the `aiohttp` package (`pip install rfcx[async]`).
+
+    Args:
+        client: (optional, default=None) Client to take the credentials from. A new one is created if None.
+        max_connections: (optional, default=100) Maximum number of simultaneous connections.
+    """
+    def __init__(self, client=None, max_connections=audio.DEFAULT_MAX_WORKERS):
+        if aiohttp is None:
+            raise ImportError('AsyncClient requires aiohttp. Install it with `pip install rfcx[async]`')
+        self.client = client if client is not None else Client()
+        self.max_connections = max_connections
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def credentials(self):
+        return self.client.credentials
+
+    def authenticate(self, persist=True):
+        """Authenticate an RFCx user to obtain a token (see `rfcx.Client.authenticate`)"""
+        return self.client.authenticate(persist)
+
+    async def close(self):
+        """Close the underlying connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        # aiohttp sessions are bound to the running event loop so create it on first use
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            # Long recordings can take minutes so only bound the wait between reads
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def _request(self, url):
+        logger.debug('get url: ' + url)
+        headers = http.auth_headers(self.client._token)
+        try:
+            async with self._get_session().get(url, headers=headers) as resp:
+                if resp.status == 200:
+                    return await resp.json(content_type=None)
+                logger.error(f'HTTP status: {resp.status}')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f'Request failed: {e!r}')
+        return None
+
+    async def _save_file(self, url, local_path):
+        """ Stream the file from `url` to `local_path`
+
+            The file is written to `local_path` + `.part` and renamed when complete, so a failed
+            transfer does not leave a truncated file behind.
+
+            Returns:
+                None on success, otherwise a dict with the `url`, `local_path`, `status` and `reason` of the failure.
+        """
+        headers = http.auth_headers(self.client._token, {'Content-Type': 'application/json'})
+        part_path = local_path + audio.PARTIAL_SUFFIX
+        status = None
+        try:
+            async with self._get_session().get(url, headers=headers) as resp:
+                status = resp.status
+                if status == 200:
+                    with open(part_path, 'wb') as out_file:
+                        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                            out_file.write(chunk)
+                    os.replace(part_path, local_path)
+                    print('Saved {}'.format(local_path))
+                    return None
+                reason = await self._failure_reason(resp)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            # Connection, timeout and disk errors only fail this file
+            reason = str(e) or type(e).__name__
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        print("Can not download", url)
+        print("Reason:", status, reason)
+        return {'url': url, 'local_path': local_path, 'status': status, 'reason': reason}
+
+    async def _failure_reason(self, resp):
+        """ Message of an error response, which may not be JSON (e.g. a proxy error page) """
+        try:
+            return (await resp.json(content_type=None))["message"]
+        except (ValueError, KeyError, TypeError):
+            return resp.reason
+
+    async def saveAudioFile(self,
+                            dest_path,
+                            stream,
+                            start_time,
+                            end_time,
+                            gain=1,
+                            file_ext='wav'):
+        """ Save audio to local path (see `rfcx.Client.saveAudioFile`) """
+        if not isinstance(start_time, datetime.datetime):
+            print("start_time is not type datetime")
+            return
+
+        if not isinstance(end_time, datetime.datetime):
+            print("end_time is not type datetime")
+            return
+
+        url, local_path = audio._audio_url_and_path(dest_path, stream, start_time, end_time, gain, file_ext)
+        return await self._save_file(url, local_path)
+
+    async def streamSegments(self, stream, start, end, limit=50, offset=0):
+        """Retrieve audio information about a specific stream (see `rfcx.Client.streamSegments`)"""
+        if self.credentials == None:
+            print('Not authenticated')
+            return
+
+        if stream == None:
+            print('Require stream id')
+            return
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        return await self._request(api_rfcx._stream_segments_url(stream, start, end, limit, offset))
+
+    async def downloadStreamSegments(self,
+                                     dest_path=None,
+                                     stream=None,
+                                     min_date=None,
+                                     max_date=None,
+                                     gain=1,
+                                     file_ext='wav',
+                                     max_concurrency=audio.DEFAULT_MAX_WORKERS):
+        """Download audio using audio information from `streamSegments`
+
+        Args:
+            dest_path: (Required) Path to save audio.
+            stream: (Required) Identifies a stream/site
+            min_date: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            max_date: Maximum timestamp of the audio. If None then defaults to now.
+            gain: (optional, default= 1) Input channel tone loudness
+            file_ext: (optional, default= 'wav') Audio file extension. Default to `wav`
+            max_concurrency: (optional, default= 100) Maximum number of downloads in flight.
+
+        Returns:
+            Summary dict with the number of `downloaded` segments and the list of `failed` ones (see
+            `rfcx.Client.downloadStreamSegments`).
+
+        Raises:
+            rfcx.PageError: if a page of segments cannot be listed.
+        """
+        if self.credentials == None:
+            print('Not authenticated')
+            return
+
+        if stream == None:
+            print("Please specific the stream id.")
+            return
+
+        if min_date == None:
+            min_date = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+
+        if not isinstance(min_date, datetime.datetime):
+            print("min_date is not type datetime")
+            return
+
+        if max_date == None:
+            max_date = datetime.datetime.utcnow()
+
+        if not isinstance(max_date, datetime.datetime):
+            print("max_date is not type datetime")
+            return
+
+        if dest_path == None:
+            dest_path = './audios'
+        save_path = dest_path + '/' + stream
+        if not os.path.exists(save_path):
+            os.makedirs(save_path)
+
+        start = audio._generate_date_in_isoformat(min_date)
+        end = audio._generate_date_in_isoformat(max_date)
+
+        pages = []
+        offset = 0
+        while True:
+            url = api_rfcx._stream_segments_url(stream, start, end, paging.MAX_PAGE_SIZE, offset)
+            page = paging._check_page(await self._request(url), offset)
+            if page:
+                pages.append(page)
+            # A short page is the last one
+            if len(page) < paging.MAX_PAGE_SIZE:
+                break
+            offset = offset + paging.MAX_PAGE_SIZE
+        segments = SegmentTable.from_pages(pages)
+
+        if not segments:
+            print("No data found on {} - {} at {}".format(start[:-10], end[:-10], stream))
+            return {'downloaded': 0, 'failed': []}
+
+        print("Downloading {} audio from {}".format(len(segments), stream))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        urls, local_paths = segments.urls_and_paths(audio.media_host, save_path, gain, file_ext)
+
+        async def download(index):
+            async with semaphore:
+                failure = await self._save_file(str(urls[index]), str(local_paths[index]))
+            if failure is not None:
+                failure['segment'] = segments[index]
+            return failure
+
+        failures = await asyncio.gather(*[download(i) for i in range(len(segments))])
+        failures = [failure for failure in failures if failure is not None]
+        print("Finish download on {}".format(stream))
+        if failures:
+            print("Failed to download {} of {} audio".format(len(failures), len(segments)))
+        return {'downloaded': len(segments) - len(failures), 'failed': failures}
+
+    async def streams(self,
+                      organizations=None,
+                      projects=None,
+                      created_by=None,
+                      keyword=None,
+                      is_public=True,
+                      is_deleted=False,
+                      limit=1000,
+                      offset=0):
+        """Retrieve a list of streams (see `rfcx.Client.streams`)"""
+        if created_by is not None and created_by not in ["me", "collaborators"]:
+            print("created_by can be only None, me, or collaborators")
+            return
+
+        return await self._request(api_rfcx._streams_url(organizations, projects, created_by, keyword,
+                                                         is_public, is_deleted, limit, offset))
+
+    async def annotations(self, start=None, end=None, classifications=None, stream=None, limit=50, offset=0):
+        """Retrieve a list of annotations (see `rfcx.Client.annotations`)"""
+        if (limit > 1000):
+            raise Exception("Please give the value <= 1000")
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        return await self._request(api_rfcx._annotations_url(start, end, classifications, stream, limit, offset))
+
+    async def detections(self, start=None, end=None, classifications=None, streams=None, min_confidence=None, limit=50, offset=0):
+        """Retrieve a list of detections (see `rfcx.Client.detections`)"""
+        if (limit > 1000):
+            raise Exception("Please give the value <= 1000")
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        return await self._request(api_rfcx._detections_url(start, end, classifications, streams,
+                                                            min_confidence, limit, offset))
+
+    async def ingest_audio(self, stream, filepath, timestamp):
+        """ Ingest an audio to RFCx (see `rfcx.Client.ingest_audio`) """
+        if not isinstance(timestamp, datetime.datetime):
+            print("timestamp is not type datetime")
+            return
+
+        iso_timestamp = timestamp.replace(microsecond=0).isoformat() + 'Z'
+        session = self._get_session()
+        headers = http.auth_headers(self.client._token)
+        filename = os.path.basename(filepath)
+
+        data = {'filename': filename, 'timestamp': iso_timestamp, 'stream': stream}
+        async with session.post(ingest.upload_endpoint, headers=headers, data=data) as resp:
+            post_resp = await resp.json(content_type=None) if resp.status == 200 else None
+        if (post_resp == None):
+            print('Fail to generate url for ingest an audio')
+            return
+
+        file_ext = filepath.split('.')[-1]
+        with open(filepath, 'rb') as data:
+            async with session.put(post_resp['url'], data=data, headers={'Content-Type': 'audio/' + file_ext}) as resp:
+                # Storage services usually answer a successful upload with an empty body
+                uploaded = resp.status in (200, 201)
+        if not uploaded:
+            print('Fail to ingest an audio')
+            return
+
+        status_url = ingest.upload_endpoint + '/' + post_resp['uploadId']
+        while True:
+            async with session.get(status_url, headers=headers) as resp:
+                get_resp = await resp.json(content_type=None)
+
+            if (get_resp['status'] >= 30):
+                print('Failed ({}): {}'.format(get_resp['status'], get_resp['failureMessage']))
+                break
+
+            elif (get_resp['status'] == 0 or get_resp['status'] == 10):
+                await asyncio.sleep(3)
+
+            else:
+                print('Success ingested file:', filepath)
+                break
@@ -1,101 +1,559 @@
 import datetime
-import requests
-import shutil
 import os
+import re
+import struct
+import threading
+import time
+import wave
 import concurrent.futures
+import numpy as np
+import requests
+import rfcx._http as http
+import rfcx._paging as paging
+import rfcx._concurrency as concurrency
+import rfcx._journal as journal
+import rfcx._pcm as pcm
+from rfcx._segments import SegmentTable
 from rfcx._api_rfcx import streamSegments
 
-def __save_file(url, local_path, token):
-    """ Download the file from `url` and save it locally under `local_path` """
-    headers = {
-        "Authorization": "Bearer " + token,
-        'Content-Type': 'application/json'
-    }
-    response = requests.get(url, headers=headers, stream=True)
-
-    if (response.status_code == 200):
-        with open(local_path, 'wb') as out_file:
-            response.raw.decode_content = True
-            shutil.copyfileobj(response.raw, out_file)
-            print('Saved {}'.format(local_path))
-    else:
+media_host = 'https://media-api.rfcx.org'  # TODO move to configuration
+
+DEFAULT_MAX_WORKERS = 100
+CHUNK_SIZE = 64 * 1024
+PARTIAL_SUFFIX = '.part'
+MAX_AUDIO_WINDOW = datetime.timedelta(minutes=15)
+MAX_QUEUED_PER_WORKER = 2
+
+def __save_file(url, local_path, token, session=None, limiter=None, cancel=None):
+    """ Download the file from `url` and save it locally under `local_path`
+
+        The file is written to `local_path` + `.part` and renamed when complete. If a previous
+        download was interrupted, it is resumed from the end of the `.part` file with an HTTP
+        range request. Files that are already complete are skipped.
+
+        Transient errors are retried according to the retry policy of the session. When a `limiter`
+        is given, the download waits for a free slot and reports its latency and errors to it.
+
+        Once the `cancel` token is cancelled, the download is skipped if it has not started or
+        stopped at the next chunk, and its partial file is deleted.
+
+        Returns:
+            None on success, otherwise a dict with the `url`, `local_path`, `status` and `reason` of the failure.
+    """
+    if __is_complete(local_path):
+        print('Skipped {} (already downloaded)'.format(local_path))
+        return None
+    if cancel is not None and cancel.cancelled:
+        return {'url': url, 'local_path': local_path, 'status': None, 'reason': cancel.reason}
+
+    part_path = local_path + PARTIAL_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = http.auth_headers(token, {'Content-Type': 'application/json'})
+    if offset > 0:
+        headers['Range'] = 'bytes={}-'.format(offset)
+    hooks = None
+    if limiter is not None:
+        limiter.acquire()
+        hooks = {'response': limiter.response_hook}
+    started = time.monotonic()
+    size = 0
+    status = None
+    reason = None
+    cancelled = False
+    try:
+        if cancel is not None and cancel.cancelled:
+            cancelled = True
+            return {'url': url, 'local_path': local_path, 'status': None, 'reason': cancel.reason}
+        with http.get_session(session).get(url, headers=headers, stream=True, hooks=hooks) as response:
+            status = response.status_code
+            if status == 206 and __range_start(response) != offset:
+                reason = 'Unexpected range {}'.format(response.headers.get('Content-Range'))
+            elif status == 200 or status == 206:
+                if status == 200:
+                    # The server sent the whole file rather than the missing part
+                    offset = 0
+                expected = __expected_size(response, offset)
+                with open(part_path, 'ab' if offset > 0 else 'wb') as out_file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        if cancel is not None and cancel.cancelled:
+                            cancelled = True
+                            reason = cancel.reason
+                            break
+                        out_file.write(chunk)
+                        size = size + len(chunk)
+                if cancelled:
+                    # Do not leave partial files behind a cancelled job
+                    os.remove(part_path)
+                elif expected is not None and offset + size < expected:
+                    reason = 'Incomplete download ({} of {} bytes)'.format(offset + size, expected)
+                else:
+                    os.replace(part_path, local_path)
+                    print('Saved {}'.format(local_path))
+                    return None
+            else:
+                reason = __failure_reason(response)
+            if status == 416 or reason.startswith('Unexpected range'):
+                # The partial file does not match the audio anymore so start from scratch next time
+                os.remove(part_path)
+    except requests.RequestException as e:
+        reason = str(e)
+        # The connection failed, even if it was while reading a successful response
+        status = None
+    except OSError as e:
+        # Disk errors (full, permissions...) only fail this file, like network errors
+        reason = str(e)
+    except KeyboardInterrupt:
+        cancelled = True
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        if limiter is not None:
+            limiter.release(time.monotonic() - started, size, failed=reason is not None and not cancelled,
+                            status=status)
+    if not cancelled:
         print("Can not download", url)
-        reason = response.json()
-        print("Reason:", response.status_code, reason["message"])
+        print("Reason:", status, reason)
+    return {'url': url, 'local_path': local_path, 'status': status, 'reason': reason}
+
+def __is_complete(local_path):
+    """ Whether `local_path` holds a complete download. Wav files must match the length in their header. """
+    if not os.path.exists(local_path):
+        return False
+    size = os.path.getsize(local_path)
+    if size == 0:
+        return False
+    if local_path.endswith('.wav'):
+        try:
+            with open(local_path, 'rb') as f:
+                header = f.read(12)
+        except OSError:
+            return False
+        if len(header) < 12 or header[:4] != b'RIFF':
+            return False
+        riff_size = struct.unpack('<I', header[4:8])[0]
+        # Streamed wav files may not know their length up front
+        return riff_size in (0, 0xFFFFFFFF) or size >= riff_size + 8
+    return True
+
+def __range_start(response):
+    """ First byte of a partial response according to its `Content-Range` header """
+    match = re.match(r'bytes (\d+)-', response.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+def __expected_size(response, offset):
+    """ Size of the complete file according to the response headers (None if unknown) """
+    if response.status_code == 206:
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit() and 'Content-Encoding' not in response.headers:
+        return offset + int(length)
+    return None
+
+def __failure_reason(response):
+    """ Message of an error response from the media api """
+    try:
+        return response.json()["message"]
+    except (ValueError, KeyError, TypeError):
+        return response.reason
 
 def __local_audio_file_path(path, audio_name, audio_extension):
     """ Create string for the name and the path """    
     return path + '/' + audio_name + "." + audio_extension
 
-def __generate_date_in_isoformat(date):
+def _generate_date_in_isoformat(date):
     """ Generate date in iso format ending with `Z` """
     return date.replace(microsecond=0).isoformat() + 'Z'
 
-def save_audio_file(token, dest_path, stream_id, start_time, end_time, gain=1, file_ext='wav'):
+def save_audio_file(token, dest_path, stream_id, start_time, end_time, gain=1, file_ext='wav', session=None):
     """ Prepare `url` and `local_path` and save it using function `__save_file` 
         Args:
+            token: RFCx client token.
             dest_path: Audio save path.
             stream_id: Stream id to get the segment.
             start_time: Minimum timestamp to get the audio.
             end_time: Maximum timestamp to get the audio. (Should not more than 15 min range)
             gain: (optional, default = 1) Input channel tone loudness
             file_ext: (optional, default = 'wav') Extension for saving audio files.
+            session: (optional, default = None) Keep-alive session to download with.
 
         Returns:
-            None.
+            None on success, otherwise a dict describing the failure.
 
         Raises:
             TypeError: if missing required arguements.
     
     """
-    start = iso_to_rfcx_custom_format(__generate_date_in_isoformat(start_time))
-    end = iso_to_rfcx_custom_format(__generate_date_in_isoformat(end_time))
-    audio_name = "{stream_id}_t{start_time}.{end_time}_g{gain}_f{file_ext}".format(stream_id=stream_id,
-                                                                                    start_time=start,
-                                                                                    end_time=end,
-                                                                                    gain=gain,
-                                                                                    file_ext=file_ext)
-    url = "https://media-api.rfcx.org/internal/assets/streams/" + audio_name + "." + file_ext
+    url, local_path = _audio_url_and_path(dest_path, stream_id, start_time, end_time, gain, file_ext)
+    return __save_file(url, local_path, token, session)
+
+def save_audio_files(token, dest_path, windows, gain=1, file_ext='wav', max_workers=DEFAULT_MAX_WORKERS,
+                     session=None, stitch=False, cancel=None):
+    """ Save the audio of many time ranges, splitting ranges longer than 15 minutes
+
+        All the parts of all the windows are downloaded through one pool of `max_workers` threads.
+
+        Args:
+            token: RFCx client token.
+            dest_path: Audio save path.
+            windows: List of `(stream_id, start_time, end_time)`, possibly across streams.
+            gain: (optional, default = 1) Input channel tone loudness
+            file_ext: (optional, default = 'wav') Extension for saving audio files.
+            max_workers: (optional, default = 100) Number of parallel downloads.
+            session: (optional, default = None) Keep-alive session shared by the download workers.
+            stitch: (optional, default = False) Join the parts of a split window into a single file
+                (named after the whole window) and delete the parts. Only supported for wav.
+            cancel: (optional, default = None) `CancellationToken` to stop the downloads early.
+
+        Returns:
+            List with a result per window, in the same order: the `stream`, `start` and `end` of the
+            window, the saved `files` and the `failed` parts (see `save_audio_file`).
+
+        Raises:
+            ValueError: if `stitch` is set for another format than wav.
+    """
+    if stitch and file_ext != 'wav':
+        raise ValueError('Only wav files can be stitched')
+    if not os.path.exists(dest_path):
+        os.makedirs(dest_path)
+
+    if cancel is None:
+        cancel = concurrency.CancellationToken()
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        downloads = []
+        for stream_id, start_time, end_time in windows:
+            parts = [_audio_url_and_path(dest_path, stream_id, part_start, part_end, gain, file_ext)
+                     for part_start, part_end in _split_time_range(start_time, end_time, MAX_AUDIO_WINDOW)]
+            if stitch and len(parts) > 1:
+                _, local_path = _audio_url_and_path(dest_path, stream_id, start_time, end_time, gain, file_ext)
+                if __is_complete(local_path):
+                    # Stitched by a previous run
+                    parts = [(None, local_path)]
+            results.append({'stream': stream_id, 'start': start_time, 'end': end_time,
+                            'files': [local_path for _, local_path in parts], 'failed': []})
+            downloads.append([executor.submit(__save_file, url, local_path, token, session, cancel=cancel)
+                              for url, local_path in parts if url is not None])
+        concurrency.wait_all([future for futures in downloads for future in futures], cancel)
+
+        stitches = []
+        for result, futures in zip(results, downloads):
+            result['failed'] = [failure for failure in (f.result() for f in futures) if failure is not None]
+            if stitch and len(result['files']) > 1 and not result['failed']:
+                _, local_path = _audio_url_and_path(dest_path, result['stream'], result['start'], result['end'],
+                                                    gain, file_ext)
+                stitches.append((result, local_path, executor.submit(__stitch_wav, result['files'], local_path)))
+        for result, local_path, future in stitches:
+            try:
+                future.result()
+            except (wave.Error, EOFError, OSError) as e:
+                # The parts are kept, only this window is reported as failed
+                print("Can not stitch", local_path)
+                print("Reason:", e)
+                result['failed'] = [{'url': None, 'local_path': local_path, 'status': None,
+                                     'reason': 'Can not stitch: {}'.format(e)}]
+                continue
+            result['files'] = [local_path]
+
+    failed = sum(1 for result in results if result['failed'])
+    if cancel.cancelled:
+        print("{}: {} of {} audio were not saved".format(cancel.reason, failed, len(results)))
+    elif failed:
+        print("Failed to save {} of {} audio".format(failed, len(results)))
+    return results
+
+def __stitch_wav(paths, local_path):
+    """ Join wav files with the same format into `local_path` and delete them
+
+        Raises:
+            wave.Error: if a file is not a PCM wav file or its format differs from the first one.
+    """
+    part_path = local_path + PARTIAL_SUFFIX
+    try:
+        with wave.open(part_path, 'wb') as out_file:
+            for i, path in enumerate(paths):
+                with wave.open(path, 'rb') as in_file:
+                    params = in_file.getparams()
+                    if i == 0:
+                        out_file.setparams(params)
+                        first = params
+                    elif params[:3] != first[:3] or params.comptype != first.comptype:
+                        raise wave.Error('{} has another format than {}'.format(path, paths[0]))
+                    while True:
+                        frames = in_file.readframes(CHUNK_SIZE)
+                        if not frames:
+                            break
+                        out_file.writeframes(frames)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, local_path)
+    for path in paths:
+        os.remove(path)
+    print('Saved {}'.format(local_path))
+
+def _audio_url_and_path(dest_path, stream_id, start_time, end_time, gain, file_ext):
+    """ Media api `url` and `local_path` for a time range of a stream """
+    audio_name = _audio_name(stream_id, start_time, end_time, gain, file_ext)
+    url = media_host + "/internal/assets/streams/" + audio_name + "." + file_ext
     local_path = __local_audio_file_path(dest_path, audio_name, file_ext)
-    __save_file(url, local_path, token)
+    return url, local_path
+
+def _audio_name(stream_id, start_time, end_time, gain, file_ext):
+    """ Media api name of the audio of a time range of a stream """
+    start = iso_to_rfcx_custom_format(_generate_date_in_isoformat(start_time))
+    end = iso_to_rfcx_custom_format(_generate_date_in_isoformat(end_time))
+    return "{stream_id}_t{start_time}.{end_time}_g{gain}_f{file_ext}".format(stream_id=stream_id,
+                                                                             start_time=start,
+                                                                             end_time=end,
+                                                                             gain=gain,
+                                                                             file_ext=file_ext)
+
+def fetch_audio(token, stream_id, start_time, end_time, gain=1, session=None):
+    """ Fetch the audio of a time range of a stream into memory, without writing any file
+
+        The wav response is read into a buffer allocated once from its `Content-Length` and the
+        samples are returned as a NumPy view of that buffer.
+
+        Args:
+            token: RFCx client token.
+            stream_id: Stream id to get the audio.
+            start_time: Minimum timestamp to get the audio.
+            end_time: Maximum timestamp to get the audio. (Should not more than 15 min range)
+            gain: (optional, default = 1) Input channel tone loudness
+            session: (optional, default = None) Keep-alive session to download with.
+
+        Returns:
+            Tuple of the samples (NumPy array of shape (frames,) for mono or (frames, channels)) and
+            the sample rate, or None if the audio could not be fetched.
+    """
+    url = media_host + "/internal/assets/streams/" + _audio_name(stream_id, start_time, end_time, gain, 'wav') + ".wav"
+    buffer = __fetch_into_buffer(url, token, session)
+    if buffer is None:
+        return None
+    try:
+        return pcm.decode_wav(buffer)
+    except ValueError as e:
+        # e.g. an error page of a proxy answered with a 200
+        print("Can not decode", url)
+        print("Reason:", 200, e)
+        return None
+
+def fetch_audios(token, windows, gain=1, max_workers=DEFAULT_MAX_WORKERS, session=None):
+    """ Fetch the audio of many time ranges into memory concurrently (see `fetch_audio`)
+
+        Args:
+            token: RFCx client token.
+            windows: List of `(stream_id, start_time, end_time)`.
+            gain: (optional, default = 1) Input channel tone loudness
+            max_workers: (optional, default = 100) Number of parallel downloads.
+            session: (optional, default = None) Keep-alive session shared by the download workers.
+
+        Returns:
+            List with the `(samples, sample_rate)` (or None on failure) of each window, in the same order.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda window: fetch_audio(token, window[0], window[1], window[2], gain, session),
+                                 windows))
+
+def iter_audio_blocks(token, stream_id, start_time, end_time, block_size, overlap=0, gain=1,
+                      window=MAX_AUDIO_WINDOW, session=None):
+    """ Iterate over the audio of a long time range in fixed size blocks of frames
+
+        The range is fetched one `window` at a time (see `fetch_audio`), the next window being
+        downloaded in the background while the blocks of the current one are consumed, so memory
+        use depends on `window` and not on the length of the range.
+
+        Args:
+            token: RFCx client token.
+            stream_id: Stream id to get the audio.
+            start_time: Start of the audio.
+            end_time: End of the audio.
+            block_size: Number of frames per block.
+            overlap: (optional, default = 0) Number of frames shared by consecutive blocks.
+            gain: (optional, default = 1) Input channel tone loudness
+            window: (optional, default = 15 minutes) Duration of audio fetched per request.
+            session: (optional, default = None) Keep-alive session to download with.
+
+        Returns:
+            Generator of `(timestamp, block)` with the (approximate) time of the first frame and a NumPy
+            array of `block_size` frames. The last block may be shorter. When a window cannot be fetched,
+            it is skipped and the blocks continue after the gap.
+    """
+    if not 0 <= overlap < block_size:
+        raise ValueError('Require 0 <= overlap < block_size')
+    step = block_size - overlap
+    windows = list(_split_time_range(start_time, end_time, window))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        fetch = lambda w: executor.submit(fetch_audio, token, stream_id, w[0], w[1], gain, session)
+        future = fetch(windows[0]) if windows else None
+        carry = None
+        carry_time = None
+        sample_rate = None
+        for i, (window_start, _) in enumerate(windows):
+            result = future.result()
+            future = fetch(windows[i + 1]) if i + 1 < len(windows) else None
+            if result is None or (sample_rate is not None and result[1] != sample_rate):
+                # Blocks do not span gaps in the audio
+                carry = None
+            if result is None:
+                continue
+            samples, sample_rate = result
+            if carry is None or len(carry) == 0:
+                buffer, buffer_time = samples, window_start
+            else:
+                buffer, buffer_time = np.concatenate([carry, samples]), carry_time
+            pos = 0
+            while pos + block_size <= len(buffer):
+                yield buffer_time + datetime.timedelta(seconds=pos / sample_rate), buffer[pos:pos + block_size]
+                pos = pos + step
+            carry = buffer[pos:].copy()
+            carry_time = buffer_time + datetime.timedelta(seconds=pos / sample_rate)
+        # Only yield the remainder if it holds frames that were not in the previous block
+        if carry is not None and len(carry) > overlap:
+            yield carry_time, carry
+
+def _split_time_range(start_time, end_time, window):
+    """ Consecutive `(start, end)` of at most `window` covering `start_time` to `end_time` """
+    while start_time < end_time:
+        yield start_time, min(start_time + window, end_time)
+        start_time = start_time + window
+
+def __fetch_into_buffer(url, token, session=None):
+    """ Read the body of `url` into a buffer. Returns None if the request failed. """
+    headers = http.auth_headers(token)
+    try:
+        with http.get_session(session).get(url, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                print("Can not download", url)
+                print("Reason:", response.status_code, __failure_reason(response))
+                return None
+            expected = __expected_size(response, 0)
+            if expected is None:
+                buffer = bytearray()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    buffer.extend(chunk)
+                return buffer
+            buffer = bytearray(expected)
+            view = memoryview(buffer)
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                view[size:size + len(chunk)] = chunk
+                size = size + len(chunk)
+            if size < expected:
+                print("Can not download", url)
+                print("Reason:", response.status_code, 'Incomplete download ({} of {} bytes)'.format(size, expected))
+                return None
+            return buffer
+    except requests.RequestException as e:
+        print("Can not download", url)
+        print("Reason:", None, e)
+        return None
 
 def iso_to_rfcx_custom_format(time):
     """Convert RFCx iso format to RFCx custom format"""
     return time.replace('-', '').replace(':', '').replace('.', '')
 
-def __get_all_segments(token, stream_id, start, end):
-    """Get all audio segment in the `start` and `end` time range"""
-    all_segments = []
-    empty_segment = False
-    offset = 0
+def __get_all_segments(token, stream_id, start, end, parallel=False, session=None, cache=None, cancel=None):
+    """Get all audio segment in the `start` and `end` time range as a `SegmentTable`
 
-    while not empty_segment:
-        # No data will return empty array from server
-        segments = streamSegments(token, stream_id, start, end, limit=1000, offset=offset)
-        if segments:
-            all_segments.extend(segments)
-            offset = offset + 1000
-        else:
-            empty_segment = True
-
-    return all_segments
-
-def __segmentDownload(save_path, gain, file_ext, segment, token):
-    """Download audio using the core api(v2)"""
-    stream_id = segment['stream']['id']
-    start = iso_to_rfcx_custom_format(segment['start'])
-    end = iso_to_rfcx_custom_format(segment['end'])
-    custom_time_range = start + '.' + end
-    rfcx_audio_format = "{stream_id}_t{time}_rfull_g{gain}_f{file_ext}".format(stream_id=stream_id,
-                                                                                                time=custom_time_range,
-                                                                                                gain=gain,
-                                                                                                file_ext=file_ext)
-    audio_name = "{}_{}_{}_gain{}".format(stream_id, start, segment['id'], gain)
-    url = "https://media-api.rfcx.org/internal/assets/streams/" + rfcx_audio_format + "." + file_ext
-    local_path = __local_audio_file_path(save_path, audio_name, file_ext)
-    __save_file(url, local_path, token)
-
-def downloadStreamSegments(token, dest_path, stream, min_date, max_date, gain=1, file_ext='wav', parallel=True):
+    When `parallel` is set, several offsets are requested at the same time (see
+    `rfcx._paging.iter_pages_parallel`) instead of one page after the other. Once `cancel` is
+    cancelled, no more pages are listed and the segments listed so far are returned.
+    """
+    fetch_page = lambda limit, offset: streamSegments(token, stream_id, start, end, limit=limit, offset=offset,
+                                                      session=session, cache=cache)
+    if parallel:
+        pages = paging.iter_pages_parallel(fetch_page)
+    else:
+        pages = paging.iter_pages(fetch_page)
+    if cancel is not None:
+        pages = __until_cancelled(pages, cancel)
+
+    # Segments added while listing shift later pages, so the same segment can be returned twice
+    return SegmentTable.from_pages(pages)
+
+def __until_cancelled(pages, cancel):
+    """Yield `pages` until `cancel` is cancelled, checking before each page is requested"""
+    pages = iter(pages)
+    while not cancel.cancelled:
+        page = next(pages, None)
+        if page is None:
+            return
+        yield page
+
+def __segmentDownload(url, local_path, segments, index, token, session=None, limiter=None, cancel=None):
+    """Download audio using the core api(v2). Returns None on success or a dict describing the failure."""
+    failure = __save_file(str(url), str(local_path), token, session, limiter, cancel)
+    if failure is not None:
+        failure['segment'] = segments[index]
+    return failure
+
+def __download_pipelined(token, save_path, stream, start, end, gain, file_ext, max_workers, session, cache,
+                         limiter, cancel):
+    """ Download the segments of a stream while they are being listed
+
+        At most `MAX_QUEUED_PER_WORKER` downloads per worker are queued, listing waits for the queue
+        to drain when it is full. Only the failures are kept once a download completes.
+
+        Returns:
+            Tuple of the number of segments listed and the list of failures
+    """
+    fetch_page = lambda limit, offset: streamSegments(token, stream, start, end, limit=limit, offset=offset,
+                                                      session=session, cache=cache)
+    slots = threading.BoundedSemaphore(max_workers * MAX_QUEUED_PER_WORKER)
+    lock = threading.Lock()
+    in_flight = {}
+    failures = []
+    count = 0
+
+    def done(future):
+        with lock:
+            segment, url, local_path = in_flight.pop(future)
+        try:
+            failure = future.result()
+        except Exception as e:
+            # Exceptions raised in a done callback are only logged, report them as failures instead
+            failure = {'segment': segment, 'url': url, 'local_path': local_path, 'status': None, 'reason': str(e)}
+        finally:
+            slots.release()
+        if failure is not None:
+            failures.append(failure)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            previous_ids = set()
+            for page in __until_cancelled(paging.iter_pages(fetch_page), cancel):
+                # Segments added while listing shift the next page, so it can repeat the end of this one
+                segments = SegmentTable.from_records([s for s in page if s['id'] not in previous_ids])
+                previous_ids = set(s['id'] for s in page)
+                urls, local_paths = segments.urls_and_paths(media_host, save_path, gain, file_ext)
+                for i in range(len(segments)):
+                    while not slots.acquire(timeout=concurrency.WAIT_INTERVAL):
+                        pass
+                    future = executor.submit(__segmentDownload, urls[i], local_paths[i], segments, i, token,
+                                             session, limiter, cancel)
+                    with lock:
+                        in_flight[future] = (segments[i], str(urls[i]), str(local_paths[i]))
+                    future.add_done_callback(done)
+                    count = count + 1
+            with lock:
+                remaining = list(in_flight)
+            concurrency.wait_all(remaining, cancel)
+        except KeyboardInterrupt:
+            cancel.cancel()
+            with lock:
+                remaining = list(in_flight)
+            concurrent.futures.wait(remaining)
+            raise
+    return count, failures
+
+def downloadStreamSegments(token, dest_path, stream, min_date, max_date, gain=1, file_ext='wav', parallel=True,
+                           max_workers=DEFAULT_MAX_WORKERS, session=None, cache=None, segments=None,
+                           adaptive=False, min_workers=1, cancel=None, pipeline=False):
     """ Download RFCx audio on specific time range using `streamSegments` to get audio segments information
         and save it using function `__save_file`
         Args:
@@ -106,10 +564,27 @@ def downloadStreamSegments(token, dest_path, stream, min_date, max_date, gain=1,
             max_date: Download end date
             gain: (optional, default= 1) Input channel tone loudness
             file_ext: (optional, default= 'wav') Extension for saving audio file.
-            parallel: (optional, default= True) Enable to parallel download audio from RFCx
+            parallel: (optional, default= True) Enable to parallel listing and download audio from RFCx
+            max_workers: (optional, default= 100) Number of parallel downloads (upper bound when `adaptive`)
+            session: (optional, default= None) Keep-alive session shared by the download workers
+            cache: (optional, default= None) Response cache for listing the segments
+            segments: (optional, default= None) Segments (a list or a `SegmentTable`) to download instead of
+                listing them from `min_date` to `max_date`, e.g. the `segment` of each failure from a previous run.
+            adaptive: (optional, default= False) Tune the number of parallel downloads between `min_workers`
+                and `max_workers` from the observed latency, errors and throttling (see `AdaptiveLimiter`).
+            min_workers: (optional, default= 1) Lower bound of parallel downloads when `adaptive`
+            cancel: (optional, default= None) `CancellationToken` to stop the job, e.g. when its deadline
+                has passed. Downloads in progress stop and delete their partial file, queued ones are
+                skipped. Ctrl-C cancels the job the same way.
+            pipeline: (optional, default= False) Start downloading as soon as the first page of segments is
+                listed. Pages feed a bounded queue of downloads, so memory use does not grow with the length
+                of the time range. Ignored when `segments` are given.
 
         Returns:
-            None.
+            Summary dict with the number of `downloaded` segments and the list of `failed` ones. Each
+            failure has the `segment`, `url`, `local_path`, `status` and `reason`. The `concurrency` entry
+            reports the number of parallel downloads (and the throughput statistics when `adaptive`).
+            `cancelled` tells whether the job was cancelled before the end.
 
         Raises:
             TypeError: if missing required arguements.
@@ -118,23 +593,117 @@ def downloadStreamSegments(token, dest_path, stream, min_date, max_date, gain=1,
     if not os.path.exists(save_path):
         os.makedirs(save_path)
 
-    start = __generate_date_in_isoformat(min_date)
-    end = __generate_date_in_isoformat(max_date)
+    if cancel is None:
+        cancel = concurrency.CancellationToken()
+    failures = []
+    limiter = None
+    if parallel and adaptive:
+        limiter = concurrency.AdaptiveLimiter(min_workers, max_workers)
 
-    segments = __get_all_segments(token, stream, start, end)
+    if segments is None and pipeline:
+        start = _generate_date_in_isoformat(min_date)
+        end = _generate_date_in_isoformat(max_date)
+        print("Downloading audio from {} while listing".format(stream))
+        count, failures = __download_pipelined(token, save_path, stream, start, end, gain, file_ext,
+                                               max_workers if parallel else 1, session, cache, limiter, cancel)
+    else:
+        if segments is None:
+            start = _generate_date_in_isoformat(min_date)
+            end = _generate_date_in_isoformat(max_date)
+            segments = __get_all_segments(token, stream, start, end, parallel, session, cache, cancel)
+        else:
+            segments = SegmentTable.from_records(segments)
+        count = len(segments)
+        if segments:
+            print("Downloading {} audio from {}".format(count, stream))
+            urls, local_paths = segments.urls_and_paths(media_host, save_path, gain, file_ext)
+            if(parallel):
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = []
+                    for i in range(len(segments)):
+                        futures.append(executor.submit(__segmentDownload, urls[i], local_paths[i], segments, i, token,
+                                                       session, limiter, cancel))
 
-    if segments:
-        print("Downloading {} audio from {}".format(len(segments), stream))
-        if(parallel):
-            with concurrent.futures.ThreadPoolExecutor(max_workers=100) as executor:
-                futures = []
-                for segment in segments:
-                    futures.append(executor.submit(__segmentDownload, save_path, gain, file_ext, segment, token))
+                    concurrency.wait_all(futures, cancel)
+                    failures = [future.result() for future in futures]
+            else:
+                for i in range(len(segments)):
+                    failures.append(__segmentDownload(urls[i], local_paths[i], segments, i, token, session,
+                                                      cancel=cancel))
+            failures = [failure for failure in failures if failure is not None]
 
-                futures, _ = concurrent.futures.wait(futures)
-        else:
-            for segment in segments:
-                __segmentDownload(save_path, gain, file_ext, segment, token)
+    if count:
         print("Finish download on {}".format(stream))
+        if cancel.cancelled:
+            print("{}: {} of {} audio were not downloaded".format(cancel.reason, len(failures), count))
+        elif failures:
+            print("Failed to download {} of {} audio".format(len(failures), count))
+    elif cancel.cancelled:
+        print("{}: no audio was listed at {}".format(cancel.reason, stream))
+    elif min_date is not None and max_date is not None:
+        print("No data found on {} - {} at {}".format(min_date.date(), max_date.date(), stream))
+    else:
+        print("No data to download at {}".format(stream))
+
+    summary = {'downloaded': count - len(failures), 'failed': failures, 'cancelled': cancel.cancelled}
+    if limiter is not None:
+        summary['concurrency'] = limiter.stats()
+        print("Settled on {} parallel downloads".format(summary['concurrency']['concurrency']))
     else:
-        print("No data found on {} - {} at {}".format(start[:-10], end[:-10], stream))
+        summary['concurrency'] = {'concurrency': max_workers if parallel else 1}
+    return summary
+
+def sync_stream(token, dest_path, stream, min_date, gain=1, file_ext='wav', max_workers=DEFAULT_MAX_WORKERS,
+                session=None, cache=None, journal_path=None, cancel=None):
+    """ Bring a local copy of a stream up to date, downloading only the segments that are new or failed before
+
+        Every segment is recorded with its download status in a SQLite journal. Only segments ending
+        after the latest one in the journal are listed, so a repeated sync costs time proportional to
+        the new data.
+
+        Args:
+            token: RFCx client token.
+            dest_path: Audio save path (segments are saved in a sub-directory named after the stream).
+            stream: Identifies a stream/site
+            min_date: Start date of the first sync. Later syncs continue from the journal.
+            gain: (optional, default= 1) Input channel tone loudness
+            file_ext: (optional, default= 'wav') Extension for saving audio file.
+            max_workers: (optional, default= 100) Number of parallel downloads
+            session: (optional, default= None) Keep-alive session shared by the download workers
+            cache: (optional, default= None) Response cache for listing the segments
+            journal_path: (optional, default= None) Location of the journal. Defaults to `.rfcx_sync` in `dest_path`.
+            cancel: (optional, default= None) `CancellationToken` to stop the downloads early. Segments
+                that were not downloaded are retried by the next sync.
+
+        Returns:
+            Summary dict with the number of `new` segments listed, the number `downloaded`, the list of
+            `failed` ones, whether the sync was `cancelled` and the number of segments per status in
+            the journal (`journal`).
+    """
+    if not os.path.exists(dest_path):
+        os.makedirs(dest_path)
+    sync_journal = journal.SyncJournal(journal_path or dest_path + '/.rfcx_sync')
+    try:
+        start = sync_journal.high_water_mark(stream) or _generate_date_in_isoformat(min_date)
+        end = _generate_date_in_isoformat(datetime.datetime.utcnow())
+        # Pages are listed in time order, so a cancelled listing continues from the last segment next time
+        new = sync_journal.add(__get_all_segments(token, stream, start, end, True, session, cache, cancel))
+
+        missing = sync_journal.missing(stream)
+        summary = {'downloaded': 0, 'failed': [], 'cancelled': cancel is not None and cancel.cancelled}
+        if missing:
+            summary = downloadStreamSegments(token, dest_path, stream, None, None, gain, file_ext,
+                                             max_workers=max_workers, session=session, segments=missing,
+                                             cancel=cancel)
+            failed_ids = set(failure['segment']['id'] for failure in summary['failed'])
+            sync_journal.mark([s['id'] for s in missing if s['id'] not in failed_ids], journal.DONE)
+            sync_journal.mark(failed_ids, journal.FAILED)
+        elif summary['cancelled']:
+            print("{}: {} was not synced".format(cancel.reason, stream))
+        else:
+            print("{} is up to date".format(stream))
+        summary['new'] = new
+        summary['journal'] = sync_journal.counts(stream)
+        return summary
+    finally:
+        sync_journal.close()
@@ -5,19 +5,51 @@ import re
 import rfcx.audio as audio
 import rfcx.ingest as ingest
 import rfcx._util as util
+import rfcx._http as http
+import rfcx._paging as paging
+import rfcx._cache as cache
+import rfcx._frames as frames
+import rfcx._ingest_index as ingest_index
+from rfcx._segments import SegmentTable
 import rfcx._pkce as pkce
 import rfcx._api_rfcx as api_rfcx
 import rfcx._api_auth as api_auth
 from rfcx._credentials import Credentials
+from rfcx._token import TokenProvider
+
+CLIENT_ID = 'LS4dJlP8J2iOBr2snzm6N8I5u7FLSUGd'
 
 
 class Client(object):
-    """Authenticate and perform requests against the RFCx platform"""
-    def __init__(self):
+    """Authenticate and perform requests against the RFCx platform
+
+    All requests made by a client share one pool of keep-alive connections. Transient failures
+    (connection errors, 429 and 5xx responses) are retried with exponential backoff. The token is
+    refreshed in the background before it expires, so long running jobs keep working.
+
+    Methods that go through all the pages of a query (the `iter_*` generators, `*_frame`,
+    `sharded_*`, `stream_segment_table` and the segment listing of downloads) raise
+    `rfcx.PageError` when a page cannot be retrieved, rather than returning incomplete results.
+
+    Args:
+        pool_connections: (optional, default=10) Number of hosts to keep a connection pool for.
+        pool_maxsize: (optional, default=100) Maximum connections kept alive per host. Should be at
+            least the number of parallel download workers.
+        retry: (optional, default=None) `rfcx.RetryPolicy` for failed requests. Defaults to
+            5 attempts honoring `Retry-After`.
+        timeout: (optional, default=(10, 60)) Connect and read timeouts in seconds. The read timeout
+            applies to each read, so a stalled download fails (and is retried) instead of hanging.
+    """
+    def __init__(self, pool_connections=http.DEFAULT_POOL_CONNECTIONS, pool_maxsize=audio.DEFAULT_MAX_WORKERS,
+                 retry=None, timeout=(http.DEFAULT_CONNECT_TIMEOUT, http.DEFAULT_READ_TIMEOUT)):
         self.credentials = None
         self.default_site = None
         self.accessible_sites = None
         self.persisted_credentials_path = '.rfcx_credentials'
+        self.session = http.create_session(pool_connections, pool_maxsize, retry, timeout)
+        self.cache = None
+        self.ingest_index = None
+        self._token = TokenProvider(lambda: self.credentials, self._refresh_credentials)
 
     def authenticate(self, persist=True):
         """Authenticate an RFCx user to obtain a token
@@ -37,7 +69,7 @@ class Client(object):
             print('Already authenticated')
             return
 
-        client_id = 'LS4dJlP8J2iOBr2snzm6N8I5u7FLSUGd'
+        client_id = CLIENT_ID
         access_token = None
 
         # Attempt to load the credentials from disk
@@ -60,7 +92,7 @@ class Client(object):
                     has_error = False
                     try:
                         access_token, refresh_token, token_expiry, id_token = api_auth.refresh(
-                            refresh_token, client_id)
+                            refresh_token, client_id, session=self.session)
                     except api_auth.TokenError:
                         has_error = True
                     if not has_error:
@@ -89,7 +121,7 @@ class Client(object):
 
         # Perform the exchange
         access_token, refresh_token, token_expiry, id_token = api_auth.authcode_exchange(
-            code.strip(), code_verifier, client_id, scope)
+            code.strip(), code_verifier, client_id, scope, session=self.session)
         self._setup_credentials(access_token, token_expiry, refresh_token,
                                 id_token)
 
@@ -102,10 +134,51 @@ class Client(object):
         if persist:
             self._persist_credentials()
 
+    def enable_cache(self, path='.rfcx_cache', max_bytes=cache.DEFAULT_MAX_BYTES):
+        """Cache the responses of `streamSegments`, `streams`, `annotations` and `detections` on disk
+
+        Queries over time ranges that ended well in the past are kept for a long time, more recent
+        ones only for a few minutes. Cached responses are only returned to the user who requested them.
+        Statistics are available from `client.cache.stats()`.
+
+        Args:
+            path: (optional, default='.rfcx_cache') Location of the cache file.
+            max_bytes: (optional, default=512MB) Maximum size of the cache. The least recently used
+                responses are evicted beyond this size.
+
+        Returns:
+            The `ResponseCache`
+        """
+        self.cache = cache.ResponseCache(path, max_bytes)
+        self._update_cache_identity()
+        return self.cache
+
+    def enable_ingest_index(self, path='.rfcx_ingest'):
+        """Remember the audio files ingested by `ingest_audio` and `ingest_directory` and skip duplicates
+
+        Files are identified by the hash of their content, the stream and the timestamp, so a file
+        ingested successfully before (even under another name) is not uploaded again.
+
+        Args:
+            path: (optional, default='.rfcx_ingest') Location of the index file.
+
+        Returns:
+            The `IngestIndex`
+        """
+        self.ingest_index = ingest_index.IngestIndex(path)
+        return self.ingest_index
+
+    def _update_cache_identity(self):
+        if self.cache is not None and self.credentials is not None and self.credentials.id_object:
+            id_object = self.credentials.id_object
+            self.cache.identity = id_object.get('sub', id_object.get('email'))
+
     def _setup_credentials(self, access_token, token_expiry, refresh_token,
                            id_token):
         self.credentials = Credentials(access_token, token_expiry,
                                        refresh_token, id_token)
+        self._update_cache_identity()
+        self._token.start()
         app_meta = self.credentials.id_object['https://rfcx.org/app_metadata']
         if app_meta:
             self.accessible_sites = app_meta.get('accessibleSites', [])
@@ -117,6 +190,14 @@ class Client(object):
                     "User does not have sufficient privileges. Please check you have access to https://dashboard.rfcx.org or contact support."
                 )
 
+    def _refresh_credentials(self):
+        c = self.credentials
+        access_token, refresh_token, token_expiry, id_token = api_auth.refresh(c.refresh_token, CLIENT_ID,
+                                                                               session=self.session)
+        self._setup_credentials(access_token, token_expiry, refresh_token, id_token)
+        if os.path.exists(self.persisted_credentials_path):
+            self._persist_credentials()
+
     def _persist_credentials(self):
         c = self.credentials
         with open(self.persisted_credentials_path, 'w') as f:
@@ -145,7 +226,7 @@ class Client(object):
             file_ext: (optional, default = 'wav') Extension for saving audio files.
 
         Returns:
-            None.
+            None on success, otherwise a dict describing the failure.
 
         Raises:
             TypeError: if missing required arguements.
@@ -159,8 +240,111 @@ class Client(object):
             print("end_time is not type datetime")
             return
 
-        return audio.save_audio_file(self.credentials.id_token, dest_path,
-                                     stream, start_time, end_time, file_ext)
+        return audio.save_audio_file(self._token, dest_path,
+                                     stream, start_time, end_time, gain, file_ext,
+                                     session=self.session)
+
+
+    def saveAudioFiles(self, dest_path, windows, gain=1, file_ext='wav', max_workers=audio.DEFAULT_MAX_WORKERS,
+                       stitch=False, cancel=None):
+        """ Save the audio of many time ranges in parallel
+        Args:
+            dest_path: Audio save path.
+            windows: List of `(stream, start_time, end_time)`, possibly across streams. Ranges longer
+                than 15 min are split into several files.
+            gain: (optional, default = 1) Input channel tone loudness
+            file_ext: (optional, default = 'wav') Extension for saving audio files.
+            max_workers: (optional, default = 100) Number of parallel downloads.
+            stitch: (optional, default = False) Join the files of a split range back into one file (wav only).
+            cancel: (optional, default = None) `rfcx.CancellationToken` to stop the downloads early.
+
+        Returns:
+            List with a result per window: the `stream`, `start` and `end` of the window, the saved `files`
+            and the `failed` downloads.
+
+        Raises:
+            ValueError: if `stitch` is set for another format than wav.
+        """
+        # The windows may be a generator, they are read twice
+        windows = list(windows)
+        for _, start_time, end_time in windows:
+            if not isinstance(start_time, datetime.datetime) or not isinstance(end_time, datetime.datetime):
+                print("start_time and end_time should be type datetime")
+                return
+
+        return audio.save_audio_files(self._token, dest_path, windows, gain, file_ext, max_workers,
+                                      session=self.session, stitch=stitch, cancel=cancel)
+
+
+    def fetchAudio(self, stream, start_time, end_time, gain=1):
+        """ Fetch audio straight into memory, e.g. to score it with a model without writing files
+        Args:
+            stream: Identifies a stream/site.
+            start_time: Minimum timestamp to get the audio.
+            end_time: Maximum timestamp to get the audio. (Should not more than 15 min range)
+            gain: (optional, default = 1) Input channel tone loudness
+
+        Returns:
+            Tuple of the samples (NumPy array of shape (frames,) for mono or (frames, channels)) and the
+            sample rate, or None if the audio could not be fetched.
+        """
+        if not isinstance(start_time, datetime.datetime):
+            print("start_time is not type datetime")
+            return
+
+        if not isinstance(end_time, datetime.datetime):
+            print("end_time is not type datetime")
+            return
+
+        return audio.fetch_audio(self._token, stream, start_time, end_time, gain, session=self.session)
+
+
+    def iter_audio_blocks(self, stream, start_time, end_time, block_size, overlap=0, gain=1,
+                          window=audio.MAX_AUDIO_WINDOW):
+        """ Iterate over days of audio in fixed size blocks of frames, in constant memory
+        Args:
+            stream: Identifies a stream/site.
+            start_time: Start of the audio.
+            end_time: End of the audio.
+            block_size: Number of frames per block.
+            overlap: (optional, default = 0) Number of frames shared by consecutive blocks.
+            gain: (optional, default = 1) Input channel tone loudness
+            window: (optional, default = 15 minutes) Duration of audio fetched per request. The next
+                window is fetched in the background.
+
+        Returns:
+            Generator of `(timestamp, block)` with the time of the first frame and a NumPy array of
+            `block_size` frames (the last block may be shorter).
+        """
+        if not isinstance(start_time, datetime.datetime):
+            print("start_time is not type datetime")
+            return
+
+        if not isinstance(end_time, datetime.datetime):
+            print("end_time is not type datetime")
+            return
+
+        yield from audio.iter_audio_blocks(self._token, stream, start_time, end_time, block_size, overlap, gain,
+                                           window, session=self.session)
+
+
+    def fetchAudios(self, windows, gain=1, max_workers=audio.DEFAULT_MAX_WORKERS):
+        """ Fetch the audio of many time ranges straight into memory, in parallel
+        Args:
+            windows: List of `(stream, start_time, end_time)`. Each range should not be more than 15 min.
+            gain: (optional, default = 1) Input channel tone loudness
+            max_workers: (optional, default = 100) Number of parallel downloads.
+
+        Returns:
+            List with the `(samples, sample_rate)` of each window (None for the ones that could not be fetched).
+        """
+        windows = list(windows)
+        for _, start_time, end_time in windows:
+            if not isinstance(start_time, datetime.datetime) or not isinstance(end_time, datetime.datetime):
+                print("start_time and end_time should be type datetime")
+                return
+
+        return audio.fetch_audios(self._token, windows, gain, max_workers, session=self.session)
 
 
     def streamSegments(self, stream, start, end, limit=50, offset=0):
@@ -189,8 +373,66 @@ class Client(object):
         if end == None:
             end = util.date_now()
 
-        return api_rfcx.streamSegments(self.credentials.id_token, stream,
-                                       start, end, limit, offset)
+        return api_rfcx.streamSegments(self._token, stream,
+                                       start, end, limit, offset,
+                                       session=self.session, cache=self.cache)
+
+
+    def iter_stream_segments(self, stream, start=None, end=None, page_size=paging.MAX_PAGE_SIZE, incremental=False):
+        """Iterate over all the audio segments of a stream, fetching pages as needed
+
+        Args:
+            stream: (Required) Identifies a stream/site.
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            page_size: (optional, default=1000) Number of segments requested at a time.
+            incremental: (optional, default=False) Decode records as they arrive instead of prefetching whole
+                pages, so memory use stays flat whatever the page size.
+
+        Returns:
+            Generator of audio segments (unless `incremental`, the next page is prefetched while the current one is consumed)
+        """
+        if self.credentials == None:
+            print('Not authenticated')
+            return
+
+        if stream == None:
+            print('Require stream id')
+            return
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        yield from paging.iter_records(
+            lambda limit, offset: api_rfcx.streamSegments(token, stream, start, end, limit, offset,
+                                                          session=self.session, cache=self.cache,
+                                                          incremental=incremental),
+            page_size, incremental)
+
+
+    def stream_segment_table(self, stream, start=None, end=None):
+        """Retrieve all the segments of a stream in a time range as a compact `SegmentTable`
+
+        Args:
+            stream: (Required) Identifies a stream/site.
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+
+        Returns:
+            `SegmentTable` of the segments, which can be passed to `downloadStreamSegments`"""
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        return SegmentTable.from_pages(paging.iter_pages(
+            lambda limit, offset: api_rfcx.streamSegments(token, stream, start, end, limit, offset,
+                                                          session=self.session, cache=self.cache)))
 
 
     def downloadStreamSegments(self,
@@ -200,7 +442,13 @@ class Client(object):
                                max_date=None,
                                gain=1,
                                file_ext='wav',
-                               parallel=True):
+                               parallel=True,
+                               max_workers=audio.DEFAULT_MAX_WORKERS,
+                               segments=None,
+                               adaptive=False,
+                               min_workers=1,
+                               cancel=None,
+                               pipeline=False):
         """Download audio using audio information from `guardianAudio`
 
         Args:
@@ -211,9 +459,22 @@ class Client(object):
             gain: (optional, default= 1) Input channel tone loudness
             file_ext: (optional, default= 'wav') Audio file extension. Default to `wav`
             parallel: (optional, default= True) Parallel download audio. Defaults to True.
+            max_workers: (optional, default= 100) Number of parallel downloads. Keep it at or below
+                the client's `pool_maxsize` so every worker reuses a pooled connection.
+            segments: (optional, default= None) Segments (a list or a `SegmentTable`) to download instead of listing
+                them, e.g. to retry only the failures of a previous run: `[f['segment'] for f in summary['failed']]`.
+            adaptive: (optional, default= False) Tune the number of parallel downloads between `min_workers` and
+                `max_workers` on the fly from the observed latency, throughput and error/429 rates.
+            min_workers: (optional, default= 1) Lower bound of parallel downloads when `adaptive`.
+            cancel: (optional, default= None) `rfcx.CancellationToken` to stop the job, e.g.
+                `CancellationToken(deadline=3600)` to give up after an hour. Downloads in progress stop
+                and delete their partial file, queued ones are skipped. Ctrl-C cancels the job the same way.
+            pipeline: (optional, default= False) Download while listing: downloads start after the first page
+                of segments and memory use stays flat however long the time range is.
 
         Returns:
-            None.
+            Summary dict with the number of `downloaded` segments, the list of `failed` ones and the
+            `concurrency` that was used (or settled on when `adaptive`) and whether the job was `cancelled`.
         """
         if self.credentials == None:
             print('Not authenticated')
@@ -245,9 +506,66 @@ class Client(object):
                     '`audios` directory is already exits. Please specific the directory to save audio path or remove `audios` directoy'
                 )
                 return
-        return audio.downloadStreamSegments(self.credentials.id_token,
+        return audio.downloadStreamSegments(self._token,
                                             dest_path, stream, min_date,
-                                            max_date, gain, file_ext, parallel)
+                                            max_date, gain, file_ext, parallel,
+                                            max_workers=max_workers,
+                                            session=self.session,
+                                            cache=self.cache,
+                                            segments=segments,
+                                            adaptive=adaptive,
+                                            min_workers=min_workers,
+                                            cancel=cancel,
+                                            pipeline=pipeline)
+
+
+    def syncStream(self,
+                   stream,
+                   dest_path,
+                   min_date=None,
+                   gain=1,
+                   file_ext='wav',
+                   max_workers=audio.DEFAULT_MAX_WORKERS,
+                   journal_path=None,
+                   cancel=None):
+        """Incrementally mirror a stream to a local directory
+
+        Segment ids, start/end and download status are recorded in a local SQLite journal
+        (`.rfcx_sync` in `dest_path` by default). Each sync lists only the segments newer than the
+        latest one in the journal and downloads the segments that are missing or failed before.
+
+        Args:
+            stream: (Required) Identifies a stream/site
+            dest_path: (Required) Path to save audio.
+            min_date: Start of the mirror, used by the first sync only. If None then defaults to exactly 30 days ago.
+            gain: (optional, default= 1) Input channel tone loudness
+            file_ext: (optional, default= 'wav') Audio file extension. Default to `wav`
+            max_workers: (optional, default= 100) Number of parallel downloads.
+            journal_path: (optional, default= None) Location of the journal file.
+            cancel: (optional, default= None) `rfcx.CancellationToken` to stop the sync early.
+
+        Returns:
+            Summary dict with the number of `new` segments, the number `downloaded`, the list of `failed`
+            ones and the number of segments per status in the `journal`.
+        """
+        if self.credentials == None:
+            print('Not authenticated')
+            return
+
+        if stream == None or dest_path == None:
+            print("Please specific the stream id and the destination path.")
+            return
+
+        if min_date == None:
+            min_date = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+
+        if not isinstance(min_date, datetime.datetime):
+            print("min_date is not type datetime")
+            return
+
+        return audio.sync_stream(self._token, dest_path, stream, min_date, gain, file_ext,
+                                 max_workers=max_workers, session=self.session, cache=self.cache,
+                                 journal_path=journal_path, cancel=cancel)
 
 
     def streams(self,
@@ -278,17 +596,59 @@ class Client(object):
             print("created_by can be only None, me, or collaborators")
             return
  
-        return api_rfcx.streams(self.credentials.id_token, organizations,
-                                projects, is_public, is_deleted, created_by,
-                                keyword, limit, offset)
+        return api_rfcx.streams(self._token, organizations,
+                                projects, created_by, keyword, is_public,
+                                is_deleted, limit, offset,
+                                session=self.session, cache=self.cache)
+
+
+    def iter_streams(self,
+                     organizations=None,
+                     projects=None,
+                     created_by=None,
+                     keyword=None,
+                     is_public=True,
+                     is_deleted=False,
+                     page_size=paging.MAX_PAGE_SIZE,
+                     incremental=False):
+        """Iterate over all the streams matching the filters, fetching pages as needed
+
+        Args:
+            organizations: List of organization ids
+            projects: List of organization ids
+            created_by: The stream owner. Have 3 options: None, me, or collaborators
+            keyword: Match streams name with keyword
+            is_public: (optional, default=True) Match public or private streams
+            is_deleted: (optional, default=False) Match deleted streams
+            page_size: (optional, default=1000) Number of streams requested at a time
+            incremental: (optional, default=False) Decode records as they arrive instead of prefetching whole
+                pages, so memory use stays flat whatever the page size.
+
+        Returns:
+            Generator of streams (unless `incremental`, the next page is prefetched while the current one is consumed)"""
+
+        if created_by is not None and created_by not in ["me", "collaborators"]:
+            print("created_by can be only None, me, or collaborators")
+            return
 
+        token = self._token
+        yield from paging.iter_records(
+            lambda limit, offset: api_rfcx.streams(token, organizations, projects, created_by, keyword,
+                                                   is_public, is_deleted, limit, offset,
+                                                   session=self.session, cache=self.cache,
+                                                   incremental=incremental),
+            page_size, incremental)
 
-    def ingest_audio(self, stream, filepath, timestamp):
+
+    def ingest_audio(self, stream, filepath, timestamp, progress=None, compress=False):
         """ Ingest an audio to RFCx
         Args:
             stream: Identifies a stream/site
             filepath: Local file path to be ingest
             timestamp: Audio timestamp in datetime type
+            progress: (optional, default= None) Function called with the bytes uploaded so far and the total
+            compress: (optional, default= False) Losslessly encode wav files to FLAC before uploading them
+                (requires `pip install rfcx[flac]`)
 
         Returns:
             None.
@@ -300,7 +660,42 @@ class Client(object):
 
         iso_timestamp = timestamp.replace(microsecond=0).isoformat() + 'Z'
 
-        return ingest.ingest_audio(self.credentials.id_token, stream, filepath, iso_timestamp)
+        return ingest.ingest_audio(self._token, stream, filepath, iso_timestamp,
+                                   session=self.session, progress=progress, compress=compress,
+                                   index=self.ingest_index)
+
+
+    def ingest_directory(self, stream, path, timestamp_parser, workers=ingest.DEFAULT_INGEST_WORKERS, progress=None,
+                         compress=False, encode_workers=None):
+        """ Ingest all the audio files of a directory to RFCx, several files at a time
+        Args:
+            stream: Identifies a stream/site
+            path: Directory of the audio files (sub-directories included)
+            timestamp_parser: Function returning the timestamp (datetime type) of the audio from its
+                file path, or None to skip the file. E.g. for AudioMoth files:
+                `lambda p: datetime.datetime.strptime(os.path.basename(p), '%Y%m%d_%H%M%S.WAV')`
+            workers: (optional, default= 8) Number of files ingested at the same time
+            progress: (optional, default= None) Function called with the file path, the bytes uploaded so far
+                and the size of the file
+            compress: (optional, default= False) Losslessly encode wav files to FLAC (in `encode_workers`
+                processes) before uploading them (requires `pip install rfcx[flac]`). The processes are
+                spawned, so scripts must call this under `if __name__ == '__main__':`.
+            encode_workers: (optional, default= None) Number of encoding processes. Defaults to the number of CPUs.
+
+        Returns:
+            Summary dict with the outcome of each file (`files`), the number `ingested`, `failed` and
+            `skipped`, and the throughput (`files_per_second`, `bytes_per_second`). With `compress`,
+            `compression` reports the `bytes_saved` and the `encode_seconds`. After `enable_ingest_index`,
+            files ingested before are skipped and counted in `duplicates`.
+        """
+
+        if not os.path.isdir(path):
+            print("path is not a directory")
+            return
+
+        return ingest.ingest_directory(self._token, stream, path, timestamp_parser, workers, session=self.session,
+                                       progress=progress, compress=compress, encode_workers=encode_workers,
+                                       index=self.ingest_index)
 
 
     def annotations(self, start=None, end=None, classifications=None, stream=None, limit=50, offset=0):
@@ -325,7 +720,98 @@ class Client(object):
         if end == None:
             end = util.date_now()
 
-        return api_rfcx.annotations(self.credentials.id_token, start, end, classifications, stream, limit, offset)
+        return api_rfcx.annotations(self._token, start, end, classifications, stream, limit, offset,
+                                    session=self.session, cache=self.cache)
+
+
+    def iter_annotations(self, start=None, end=None, classifications=None, stream=None, page_size=paging.MAX_PAGE_SIZE,
+                         incremental=False):
+        """Iterate over all the annotations matching the filters, fetching pages as needed
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            stream: (optional, default=None) Limit results to a given stream id.
+            page_size: (optional, default=1000) Number of annotations requested at a time. The maximum value is 1000.
+            incremental: (optional, default=False) Decode records as they arrive instead of prefetching whole
+                pages, so memory use stays flat whatever the page size.
+
+        Returns:
+            Generator of annotations (unless `incremental`, the next page is prefetched while the current one is consumed)"""
+
+        if (page_size > paging.MAX_PAGE_SIZE):
+            raise Exception("Please give the value <= 1000")
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        yield from paging.iter_records(
+            lambda limit, offset: api_rfcx.annotations(token, start, end, classifications, stream, limit, offset,
+                                                       session=self.session, cache=self.cache,
+                                                       incremental=incremental),
+            page_size, incremental)
+
+
+    def sharded_annotations(self, start=None, end=None, classifications=None, stream=None,
+                            shards=paging.DEFAULT_SHARDS, max_workers=paging.DEFAULT_SHARDS):
+        """Retrieve all the annotations matching the filters, querying time windows concurrently
+
+        The time range is split into `shards` windows fetched in parallel. Windows with more than
+        one page of results are split further. Annotations are de-duplicated on id.
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            stream: (optional, default=None) Limit results to a given stream id.
+            shards: (optional, default=8) Number of windows the time range is initially split into.
+            max_workers: (optional, default=8) Maximum number of requests in flight.
+
+        Returns:
+            List of annotations (not in time order)"""
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        return list(paging.iter_sharded_records(
+            lambda start, end, limit, offset: api_rfcx.annotations(token, start, end, classifications, stream, limit,
+                                                                   offset, session=self.session, cache=self.cache),
+            start, end, shards, max_workers))
+
+
+    def annotations_frame(self, start=None, end=None, classifications=None, stream=None, format='pandas'):
+        """Retrieve all the annotations matching the filters as a table
+
+        Pages are converted to typed columns as they arrive: datetime64 `start`/`end`, float32
+        frequencies and categorical `stream` and `classification`.
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            stream: (optional, default=None) Limit results to a given stream id.
+            format: (optional, default='pandas') `pandas` for a DataFrame or `arrow` for a pyarrow Table.
+
+        Returns:
+            Table of annotations with columns id, stream, classification, start, end, frequency_min, frequency_max"""
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        pages = paging.iter_pages(
+            lambda limit, offset: api_rfcx.annotations(token, start, end, classifications, stream, limit, offset,
+                                                       session=self.session, cache=self.cache))
+        return frames.build_frame(pages, frames.ANNOTATION_COLUMNS, format)
 
 
     def detections(self, start=None, end=None, classifications=None, streams=None, min_confidence=None, limit=50, offset=0):
@@ -351,4 +837,102 @@ class Client(object):
         if end == None:
             end = util.date_now()
 
-        return api_rfcx.detections(self.credentials.id_token, start, end, classifications, streams, min_confidence, limit, offset)
+        return api_rfcx.detections(self._token, start, end, classifications, streams, min_confidence, limit, offset,
+                                   session=self.session, cache=self.cache)
+
+
+    def iter_detections(self, start=None, end=None, classifications=None, streams=None, min_confidence=None, page_size=paging.MAX_PAGE_SIZE,
+                        incremental=False):
+        """Iterate over all the detections matching the filters, fetching pages as needed
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            streams: (optional, default=None) List of stream ids.
+            min_confidence (optional, default=None): Return the detection which equal or greater than given value. If None, it will use default in event strategy.
+            page_size: (optional, default=1000) Number of detections requested at a time. The maximum value is 1000.
+            incremental: (optional, default=False) Decode records as they arrive instead of prefetching whole
+                pages, so memory use stays flat whatever the page size.
+
+        Returns:
+            Generator of detections (unless `incremental`, the next page is prefetched while the current one is consumed)"""
+
+        if (page_size > paging.MAX_PAGE_SIZE):
+            raise Exception("Please give the value <= 1000")
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        yield from paging.iter_records(
+            lambda limit, offset: api_rfcx.detections(token, start, end, classifications, streams, min_confidence,
+                                                      limit, offset, session=self.session, cache=self.cache,
+                                                      incremental=incremental),
+            page_size, incremental)
+
+
+    def sharded_detections(self, start=None, end=None, classifications=None, streams=None, min_confidence=None,
+                           shards=paging.DEFAULT_SHARDS, max_workers=paging.DEFAULT_SHARDS):
+        """Retrieve all the detections matching the filters, querying time windows concurrently
+
+        The time range is split into `shards` windows fetched in parallel. Windows with more than
+        one page of results are split further, so a busy classification over a long period is
+        fetched in a few rounds of parallel requests instead of a long series of offsets.
+        Detections are de-duplicated on id.
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            streams: (optional, default=None) List of stream ids.
+            min_confidence (optional, default=None): Return the detection which equal or greater than given value. If None, it will use default in event strategy.
+            shards: (optional, default=8) Number of windows the time range is initially split into.
+            max_workers: (optional, default=8) Maximum number of requests in flight.
+
+        Returns:
+            List of detections (not in time order)"""
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        return list(paging.iter_sharded_records(
+            lambda start, end, limit, offset: api_rfcx.detections(token, start, end, classifications, streams,
+                                                                  min_confidence, limit, offset,
+                                                                  session=self.session, cache=self.cache),
+            start, end, shards, max_workers))
+
+
+    def detections_frame(self, start=None, end=None, classifications=None, streams=None, min_confidence=None, format='pandas'):
+        """Retrieve all the detections matching the filters as a table
+
+        Pages are converted to typed columns as they arrive: datetime64 `start`/`end`, float32
+        `confidence` and categorical `stream`, `classification` and `classifier`. This takes a
+        fraction of the memory of the equivalent list of dicts and supports vectorized filtering.
+
+        Args:
+            start: Minimum timestamp of the audio. If None then defaults to exactly 30 days ago.
+            end: Maximum timestamp of the audio. If None then defaults to now.
+            classifications: (optional, default=None) List of classification names e.g. orca, chainsaw.
+            streams: (optional, default=None) List of stream ids.
+            min_confidence (optional, default=None): Return the detection which equal or greater than given value. If None, it will use default in event strategy.
+            format: (optional, default='pandas') `pandas` for a DataFrame or `arrow` for a pyarrow Table.
+
+        Returns:
+            Table of detections with columns stream, classification, classifier, start, end, confidence"""
+
+        if start == None:
+            start = util.date_before()
+        if end == None:
+            end = util.date_now()
+
+        token = self._token
+        pages = paging.iter_pages(
+            lambda limit, offset: api_rfcx.detections(token, start, end, classifications, streams, min_confidence,
+                                                      limit, offset, session=self.session, cache=self.cache))
+        return frames.build_frame(pages, frames.DETECTION_COLUMNS, format)
\ No newline at end of file
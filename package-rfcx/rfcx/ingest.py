@@ -1,38 +1,67 @@
-import requests
+import concurrent.futures
+import datetime
+import logging
+import multiprocessing
 import time
 import os
+import shutil
+import tempfile
+import requests
+import rfcx._encode as encode
+import rfcx._http as http
+import rfcx._ingest_index as ingest_index
+import rfcx._upload as upload
+from rfcx._ingest_status import StatusPoller
+
+logger = logging.getLogger(__name__)
+
+upload_endpoint = 'https://ingest.rfcx.org/uploads'  # TODO move to configuration
+
+DEFAULT_INGEST_WORKERS = 8
+AUDIO_EXTENSIONS = ('wav', 'flac', 'opus', 'mp3')
+
+INGESTED = 'ingested'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+ALREADY_INGESTED = 'Already ingested'
 
 # POST
-def _generate_signed_url(token, upload_url, stream_id, filename, timestamp):
-    headers = {'Authorization': 'Bearer ' + token}
+def _generate_signed_url(token, upload_url, stream_id, filename, timestamp, session=None):
+    headers = http.auth_headers(token)
     data = {'filename': filename, 'timestamp': timestamp, 'stream': stream_id}
-    resp = requests.post(upload_url, headers=headers, data=data, timeout=90)
+    resp = http.get_session(session).post(upload_url, headers=headers, data=data, timeout=90)
     return resp.json() if (resp.status_code == 200) else None
 
 # PUT
-def _ingest_to_rfcx(token, upload_url, signed_url, filepath):
+def _ingest_to_rfcx(token, upload_url, signed_url, filepath, session=None, progress=None):
     file_ext = filepath.split('.')[-1]
-    headers = {'Content-Type': 'audio/' + file_ext}
-    resp = {}
-    with open(filepath, 'rb') as data:
-        resp = requests.put(signed_url, data=data, headers=headers, timeout=120)
-
-    return resp.json() if (resp.status_code == 200) else None
+    resp = upload.upload_file(signed_url, filepath, 'audio/' + file_ext, session, progress)
+    if resp is None or resp.status_code not in (200, 201):
+        return None
+    # Storage services usually answer a successful upload with an empty body
+    return resp.json() if resp.content else {}
 
 # GET
-def _get_file_status(token, upload_url, upload_id):
-    headers = {'Authorization': 'Bearer ' + token}
+def _get_file_status(token, upload_url, upload_id, session=None):
+    headers = http.auth_headers(token)
     url = upload_url + '/' + upload_id
-    resp = requests.get(url, headers=headers, timeout=90)
+    resp = http.get_session(session).get(url, headers=headers, timeout=90)
     return resp.json()
 
-def ingest_audio(token, stream_id, filepath, timestamp):
+def ingest_audio(token, stream_id, filepath, timestamp, session=None, progress=None, compress=False, index=None):
     """ Ingest an audio to RFCx
         Args:
             token: RFCx client token.
             stream_id: RFCx stream id
             filepath: Local file path to be ingest
             timestamp: Audio timestamp in iso format
+            session: (optional, default= None) Keep-alive session to upload with
+            progress: (optional, default= None) Function called with the bytes uploaded so far and the total
+            compress: (optional, default= False) Losslessly encode wav files to FLAC before uploading them
+                (requires `pip install rfcx[flac]`)
+            index: (optional, default= None) `IngestIndex` of the files already ingested. The file is not
+                uploaded again if it was ingested to the stream with the same timestamp before.
 
         Returns:
             None.
@@ -40,29 +69,231 @@ def ingest_audio(token, stream_id, filepath, timestamp):
         Raises:
             TypeError: if missing required arguements.
     """
-    upload_endpoint = 'https://ingest.rfcx.org/uploads'
-    filename = os.path.basename(filepath)
-
-    post_resp = _generate_signed_url(token, upload_endpoint, stream_id, filename, timestamp)
-    if (post_resp == None):
-        print('Fail to generate url for ingest an audio')
+    if compress:
+        encode.check_available()
+    digest = None
+    if index is not None:
+        digest = ingest_index.file_digest(filepath)
+        if index.is_ingested(digest, stream_id, timestamp):
+            print('Already ingested file:', filepath)
+            return
+    work_dir = tempfile.mkdtemp(prefix='rfcx-ingest-') if compress else None
+    try:
+        upload_path, _ = _compress(filepath, None, work_dir)
+        upload_id, reason = _upload(token, stream_id, upload_path, timestamp, session, progress)
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if upload_id is None:
+        print(reason)
         return
+    if index is not None:
+        index.mark(digest, stream_id, timestamp, filepath, upload_id, ingest_index.UPLOADED)
 
-    put_resp = _ingest_to_rfcx(token, upload_endpoint, post_resp['url'], filepath)
-    if (put_resp == None):
-        print('Fail to ingest an audio')
-        return
+    get_resp = _wait_for_status(token, upload_id, session)
+    if (get_resp['status'] >= 30):
+        print('Failed ({}): {}'.format(get_resp['status'], get_resp['failureMessage']))
+    else:
+        print('Success ingested file:', filepath)
+    if index is not None:
+        status = ingest_index.FAILED if get_resp['status'] >= 30 else ingest_index.INGESTED
+        index.mark(digest, stream_id, timestamp, filepath, upload_id, status)
+
+def ingest_directory(token, stream_id, path, timestamp_parser, workers=DEFAULT_INGEST_WORKERS, session=None,
+                     extensions=AUDIO_EXTENSIONS, progress=None, compress=False, encode_workers=None, index=None):
+    """ Ingest all the audio files of a directory (and its sub-directories) to RFCx in parallel
+
+        Signed url generation and upload run in `workers` threads. Uploaded files are handed to a
+        shared `StatusPoller` so the workers move on to the next file without waiting for the
+        processing to finish.
+
+        With `compress`, wav files are losslessly encoded to FLAC in a pool of `encode_workers`
+        processes before being uploaded, so encoding overlaps with the uploads of the previous files.
+        Wav files that cannot be stored as FLAC (e.g. floating point samples) are uploaded as they are.
+        The encoding processes are spawned rather than forked from the running upload threads, so the
+        main module of a script must be guarded with `if __name__ == '__main__':`.
+
+        With an `index`, the workers hash each file first and skip the files that were already ingested
+        to the stream with the same timestamp, before requesting an upload url.
+
+        Args:
+            token: RFCx client token.
+            stream_id: RFCx stream id
+            path: Directory of the audio files
+            timestamp_parser: Function returning the timestamp (datetime) of the audio from its file path,
+                or None to skip the file.
+            workers: (optional, default= 8) Number of files ingested at the same time
+            session: (optional, default= None) Keep-alive session to upload with
+            extensions: (optional) Extensions of the files to ingest. Defaults to wav, flac, opus and mp3.
+            progress: (optional, default= None) Function called with the file path, the bytes of the file
+                uploaded so far and its size.
+            compress: (optional, default= False) Losslessly encode wav files to FLAC before uploading them
+                (requires `pip install rfcx[flac]`)
+            encode_workers: (optional, default= None) Number of encoding processes. Defaults to the number of CPUs.
+            index: (optional, default= None) `IngestIndex` recording the files ingested, used to skip duplicates.
+
+        Returns:
+            Summary dict with an outcome per file (`files`: the `path`, `status` which is one of
+            `ingested`, `failed` or `skipped`, the `upload_id` and the failure `reason`), the number of
+            files per status, the `bytes` uploaded, the `seconds` it took and the throughput
+            (`files_per_second` and `bytes_per_second`). With `compress`, `compression` holds the
+            number of `encoded` files, their `original_bytes` and `encoded_bytes`, the `bytes_saved`
+            and the total `encode_seconds`. With an `index`, `duplicates` is the number of files skipped
+            because they were already ingested.
+    """
+    if compress:
+        encode.check_available()
+    filepaths = sorted(os.path.join(root, filename)
+                       for root, _, filenames in os.walk(path)
+                       for filename in filenames
+                       if filename.rsplit('.', 1)[-1].lower() in extensions)
+    print('Ingesting {} audio from {}'.format(len(filepaths), path))
+
+    started = time.monotonic()
+    encoder = None
+    if compress:
+        # The workers are started from upload threads, forking a process with live threads can deadlock it
+        encoder = concurrent.futures.ProcessPoolExecutor(max_workers=encode_workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+    work_dir = tempfile.mkdtemp(prefix='rfcx-ingest-') if compress else None
+    try:
+        with StatusPoller(lambda upload_id: _get_file_status(token, upload_endpoint, upload_id, session)) as poller:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(lambda filepath: _ingest_file(token, stream_id, filepath,
+                                                                           timestamp_parser, poller, session,
+                                                                           progress, encoder, work_dir, index),
+                                             filepaths))
+    finally:
+        if encoder is not None:
+            encoder.shutdown()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    seconds = time.monotonic() - started
 
-    while True:
-        get_resp = _get_file_status(token, upload_endpoint, post_resp['uploadId'])
+    summary = {'files': outcomes, 'seconds': seconds}
+    for status in (INGESTED, FAILED, SKIPPED):
+        summary[status] = sum(1 for outcome in outcomes if outcome['status'] == status)
+    summary['bytes'] = sum(outcome['bytes'] for outcome in outcomes)
+    if index is not None:
+        summary['duplicates'] = sum(1 for outcome in outcomes if outcome['reason'] == ALREADY_INGESTED)
+    summary['files_per_second'] = summary[INGESTED] / seconds if seconds > 0 else 0
+    summary['bytes_per_second'] = summary['bytes'] / seconds if seconds > 0 else 0
+    print('Ingested {} of {} audio ({} failed, {} skipped) in {:.1f}s'.format(
+        summary[INGESTED], len(outcomes), summary[FAILED], summary[SKIPPED], seconds))
+    if compress:
+        encoded = [outcome['compression'] for outcome in outcomes if outcome.get('compression')]
+        compression = {'encoded': len(encoded)}
+        for key in ('original_bytes', 'encoded_bytes', 'encode_seconds'):
+            compression[key] = sum(stats[key] for stats in encoded)
+        compression['bytes_saved'] = compression['original_bytes'] - compression['encoded_bytes']
+        summary['compression'] = compression
+        print('Encoded {} wav to FLAC in {:.1f}s, saving {} bytes'.format(
+            compression['encoded'], compression['encode_seconds'], compression['bytes_saved']))
+    return summary
 
-        if (get_resp['status'] >= 30):
-            print('Failed ({}): {}'.format(get_resp['status'], get_resp['failureMessage']))
-            break
+def _ingest_file(token, stream_id, filepath, timestamp_parser, poller, session=None, progress=None, encoder=None,
+                 work_dir=None, index=None):
+    """ Upload one file of `ingest_directory` and describe the outcome (completed once `poller` resolves it) """
+    outcome = {'path': filepath, 'status': FAILED, 'upload_id': None, 'reason': None, 'bytes': 0}
+    try:
+        timestamp = timestamp_parser(filepath)
+    except Exception as e:
+        # A user callback failing on an unexpected file name only skips that file
+        timestamp = None
+        outcome['reason'] = 'Invalid timestamp: {!r}'.format(e)
+    if not isinstance(timestamp, datetime.datetime):
+        outcome['status'] = SKIPPED
+        outcome['reason'] = outcome['reason'] or 'No timestamp'
+        return outcome
+    iso_timestamp = timestamp.replace(microsecond=0).isoformat() + 'Z'
 
-        elif (get_resp['status'] == 0 or get_resp['status'] == 10):
-            time.sleep(3)
+    try:
+        digest = None
+        if index is not None:
+            digest = ingest_index.file_digest(filepath)
+            if index.is_ingested(digest, stream_id, iso_timestamp):
+                outcome['status'] = SKIPPED
+                outcome['reason'] = ALREADY_INGESTED
+                return outcome
+        file_progress = None
+        if progress is not None:
+            file_progress = lambda sent, total: progress(filepath, sent, total)
+        upload_path, outcome['compression'] = _compress(filepath, encoder, work_dir)
+        try:
+            upload_id, reason = _upload(token, stream_id, upload_path, iso_timestamp, session, file_progress)
+            outcome['upload_id'] = upload_id
+            if upload_id is None:
+                outcome['reason'] = reason
+                return outcome
+            outcome['bytes'] = os.path.getsize(upload_path)
+        finally:
+            if upload_path != filepath:
+                shutil.rmtree(os.path.dirname(upload_path), ignore_errors=True)
+    except (requests.RequestException, OSError, ValueError) as e:
+        outcome['reason'] = str(e)
+        return outcome
+    if index is not None:
+        index.mark(digest, stream_id, iso_timestamp, filepath, upload_id, ingest_index.UPLOADED)
+    poller.track(upload_id, lambda future: _resolve_outcome(outcome, future, index, digest, stream_id, iso_timestamp))
+    return outcome
 
+def _resolve_outcome(outcome, future, index=None, digest=None, stream_id=None, timestamp=None):
+    try:
+        get_resp = future.result()
+    except Exception as e:
+        # The upload may still be processed, leave it as uploaded in the index
+        outcome['reason'] = str(e)
+        return
+    if get_resp['status'] >= 30:
+        outcome['reason'] = 'Failed ({}): {}'.format(get_resp['status'], get_resp['failureMessage'])
+    else:
+        outcome['status'] = INGESTED
+    if index is not None:
+        status = ingest_index.INGESTED if outcome['status'] == INGESTED else ingest_index.FAILED
+        index.mark(digest, stream_id, timestamp, outcome['path'], outcome['upload_id'], status)
+
+def _compress(filepath, encoder=None, work_dir=None):
+    """ Encode a wav file to FLAC in `work_dir` (in the `encoder` process pool if given)
+
+        Returns:
+            Tuple of the path of the file to upload and the compression stats (None when not encoded)
+    """
+    if work_dir is None or filepath.rsplit('.', 1)[-1].lower() != 'wav':
+        return filepath, None
+    # Keep the original name (with the flac extension) as the server stores it as the filename
+    flac_dir = tempfile.mkdtemp(dir=work_dir)
+    flac_path = os.path.join(flac_dir, os.path.splitext(os.path.basename(filepath))[0] + '.flac')
+    try:
+        if encoder is not None:
+            original_bytes, encoded_bytes, seconds = encoder.submit(encode.encode_flac, filepath, flac_path).result()
         else:
-            print('Success ingested file:', filepath)
-            break
\ No newline at end of file
+            original_bytes, encoded_bytes, seconds = encode.encode_flac(filepath, flac_path)
+    except Exception as e:
+        logger.warning('Failed to encode %s, uploading it as it is: %s', filepath, e)
+        encoded_bytes = None
+    if encoded_bytes is None:
+        shutil.rmtree(flac_dir, ignore_errors=True)
+        return filepath, None
+    return flac_path, {'original_bytes': original_bytes, 'encoded_bytes': encoded_bytes, 'encode_seconds': seconds}
+
+def _upload(token, stream_id, filepath, timestamp, session=None, progress=None):
+    """ Generate a signed url and upload the file to it
+
+        Returns:
+            Tuple of the upload id (None on failure) and the reason of the failure
+    """
+    filename = os.path.basename(filepath)
+
+    post_resp = _generate_signed_url(token, upload_endpoint, stream_id, filename, timestamp, session)
+    if (post_resp == None):
+        return None, 'Fail to generate url for ingest an audio'
+
+    put_resp = _ingest_to_rfcx(token, upload_endpoint, post_resp['url'], filepath, session, progress)
+    if (put_resp == None):
+        return None, 'Fail to ingest an audio'
+
+    return post_resp['uploadId'], None
+
+def _wait_for_status(token, upload_id, session=None):
+    """ Poll the status of an upload (with backoff) until it has been processed """
+    with StatusPoller(lambda upload_id: _get_file_status(token, upload_endpoint, upload_id, session)) as poller:
+        return poller.track(upload_id).result()
@@ -1,6 +1,6 @@
 from setuptools import setup, find_packages
 
-REQUIRED_PACKAGES = ['httplib2', 'six']
+REQUIRED_PACKAGES = ['requests', 'six', 'numpy']
 
 setup(name='rfcx',
       version='0.0.11',
@@ -9,6 +9,8 @@ setup(name='rfcx',
       author='Rainforest Connection',
       author_email='antony@rfcx.org',
       install_requires=REQUIRED_PACKAGES,
+      extras_require={'async': ['aiohttp'], 'frames': ['pandas', 'pyarrow'],
+                    'flac': ['soundfile']},
       description='Python client SDK for connecting to the Rainforest Connection platform',
       long_description="[See the documentation](https://rfcx.github.io/rfcx-sdk-python/) or [try an example](https://gist.github.com/antonyharfield/93231b3df86cd58fecee4f4d1ec9cc5b)",
       long_description_content_type="text/markdown",
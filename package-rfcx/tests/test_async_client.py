@@ -0,0 +1,118 @@
+from unittest import IsolatedAsyncioTestCase
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+
+import aiohttp
+
+from rfcx import PageError
+from rfcx.async_client import AsyncClient
+from rfcx.client import Client
+
+BODY = b'RIFF' + b'\x00' * 60
+
+
+def segments(count, first=0):
+    return [{'id': 'seg{}'.format(i), 'stream': {'id': 'stream1'},
+             'start': '2020-01-01T00:00:{:02d}.000Z'.format(i % 60), 'end': '2020-01-01T00:01:00.000Z'}
+            for i in range(first, first + count)]
+
+
+class FakeContent(object):
+    def __init__(self, body, error):
+        self.body = body
+        self.error = error
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+        if self.error is not None:
+            raise self.error
+
+
+class FakeResponse(object):
+    def __init__(self, status, body=b'', error=None):
+        self.status = status
+        self.reason = 'Service Unavailable'
+        self.content = FakeContent(body, error)
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self, content_type='application/json'):
+        return json.loads(self.body)
+
+
+class FakeSession(object):
+    """Segments api answering `pages` in turn, media api dropping the connection for the `dropped` start times"""
+    def __init__(self, pages, dropped=()):
+        self.pages = list(pages)
+        self.dropped = dropped
+        self.offsets = []
+
+    def get(self, url, headers=None):
+        if '/stream-segments' in url:
+            self.offsets.append(int(url.split('offset=')[1].split('&')[0]))
+            page = self.pages.pop(0)
+            if page is None:
+                return FakeResponse(503)
+            return FakeResponse(200, json.dumps(page).encode('utf-8'))
+        if any(start in url for start in self.dropped):
+            return FakeResponse(200, BODY[:10], aiohttp.ClientPayloadError('Connection dropped'))
+        return FakeResponse(200, BODY)
+
+    async def close(self):
+        pass
+
+
+class DownloadStreamSegmentsTests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        client = Client()
+        client.credentials = object()
+        client._token = lambda: 'token'
+        self.client = AsyncClient(client)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    async def download(self, session):
+        self.client._session = session
+        return await self.client.downloadStreamSegments(self.directory, 'stream1', datetime.datetime(2020, 1, 1),
+                                                        datetime.datetime(2020, 1, 2))
+
+    async def test_failed_downloads_are_reported(self):
+        # Arrange
+        session = FakeSession([segments(3)], dropped=['_t20200101T000001000Z.'])
+        # Act
+        summary = await self.download(session)
+        # Assert
+        self.assertEqual(2, summary['downloaded'])
+        self.assertEqual(['seg1'], [failure['segment']['id'] for failure in summary['failed']])
+        self.assertEqual(200, summary['failed'][0]['status'])
+        files = sorted(os.listdir(os.path.join(self.directory, 'stream1')))
+        self.assertEqual(2, len(files))
+        self.assertFalse(any(name.endswith('.part') or 'seg1' in name for name in files))
+
+    async def test_short_page_ends_the_listing(self):
+        # Arrange
+        session = FakeSession([segments(1000), segments(5, 1000)])
+        # Act
+        summary = await self.download(session)
+        # Assert
+        self.assertEqual(1005, summary['downloaded'])
+        self.assertEqual([0, 1000], session.offsets)
+
+    async def test_failed_page_raises(self):
+        # Arrange
+        session = FakeSession([segments(1000), None])
+        # Act & Assert
+        with self.assertRaises(PageError):
+            await self.download(session)
@@ -0,0 +1,167 @@
+from unittest import TestCase
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import io
+import threading
+import wave
+
+import numpy as np
+
+import rfcx.audio as audio
+from rfcx.client import Client
+
+SEGMENTS = [{'id': 'seg{}'.format(i), 'stream': {'id': 'stream1'},
+             'start': '2020-01-01T00:0{}:00.000Z'.format(i), 'end': '2020-01-01T00:0{}:00.000Z'.format(i + 1)}
+            for i in range(5)]
+
+
+
+def make_wav(frames=800):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out_file:
+        out_file.setnchannels(1)
+        out_file.setsampwidth(2)
+        out_file.setframerate(8000)
+        out_file.writeframes(b'\x01\x00' * frames)
+    return buffer.getvalue()
+
+
+BODY = make_wav()
+
+
+class FakeResponse(object):
+    def __init__(self, status, body):
+        self.status_code = status
+        self.body = body
+        self.headers = {'Content-Length': str(len(body))}
+        self.reason = 'Not Found'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class FakeMediaSession(object):
+    """Media api answering 404 for the urls containing one of `failing` and a non-wav page for `invalid`"""
+    def __init__(self, failing=(), invalid=()):
+        self.failing = failing
+        self.invalid = invalid
+        self.urls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, stream=False, hooks=None):
+        with self._lock:
+            self.urls.append(url)
+        if any(part in url for part in self.failing):
+            return FakeResponse(404, b'{"message": "Not found"}')
+        if any(part in url for part in self.invalid):
+            return FakeResponse(200, b'<html>Bad gateway</html>')
+        return FakeResponse(200, BODY)
+
+
+class DownloadStreamSegmentsTests(TestCase):
+    def setUp(self):
+        self.dest_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_path)
+
+    def download(self, session, segments):
+        return audio.downloadStreamSegments(None, self.dest_path, 'stream1', None, None, segments=segments,
+                                            max_workers=4, session=session)
+
+    def test_failed_summary(self):
+        # Act
+        summary = self.download(FakeMediaSession(failing=['T000200000Z.']), SEGMENTS)
+        # Assert
+        self.assertEqual(4, summary['downloaded'])
+        self.assertEqual(1, len(summary['failed']))
+        failure = summary['failed'][0]
+        self.assertEqual({'segment', 'url', 'local_path', 'status', 'reason'}, set(failure))
+        self.assertEqual(SEGMENTS[2], failure['segment'])
+        self.assertEqual((404, 'Not found'), (failure['status'], failure['reason']))
+        self.assertFalse(os.path.exists(failure['local_path']))
+
+    def test_failed_segments_can_be_retried(self):
+        # Arrange
+        summary = self.download(FakeMediaSession(failing=['T000200000Z.']), SEGMENTS)
+        session = FakeMediaSession()
+        # Act
+        retry = self.download(session, [failure['segment'] for failure in summary['failed']])
+        # Assert
+        self.assertEqual({'downloaded': 1, 'failed': []}, {k: retry[k] for k in ('downloaded', 'failed')})
+        self.assertEqual(1, len(session.urls))
+        with open(summary['failed'][0]['local_path'], 'rb') as f:
+            self.assertEqual(BODY, f.read())
+
+    def test_completed_files_are_skipped(self):
+        # Arrange
+        self.download(FakeMediaSession(), SEGMENTS)
+        session = FakeMediaSession()
+        # Act
+        summary = self.download(session, SEGMENTS)
+        # Assert
+        self.assertEqual(5, summary['downloaded'])
+        self.assertEqual([], session.urls)
+        self.assertEqual(5, len(os.listdir(os.path.join(self.dest_path, 'stream1'))))
+
+
+class FetchAudiosTests(TestCase):
+    def test_undecodable_window_is_none(self):
+        # Arrange
+        start = datetime.datetime(2020, 1, 1)
+        windows = [('stream1', start + datetime.timedelta(minutes=i), start + datetime.timedelta(minutes=i + 1))
+                   for i in range(3)]
+        session = FakeMediaSession(invalid=['T000100Z.'])
+        # Act
+        results = audio.fetch_audios(None, windows, max_workers=2, session=session)
+        # Assert
+        self.assertIsNone(results[1])
+        samples, sample_rate = results[0]
+        self.assertEqual(8000, sample_rate)
+        np.testing.assert_array_equal(np.ones(800, dtype='<i2'), samples)
+        self.assertIsNotNone(results[2])
+
+
+class ClientWindowsTests(TestCase):
+    def setUp(self):
+        self.dest_path = tempfile.mkdtemp()
+        self.client = Client()
+        self.client.session = FakeMediaSession()
+        start = datetime.datetime(2020, 1, 1)
+        self.windows = [('stream1', start + datetime.timedelta(minutes=i), start + datetime.timedelta(minutes=i + 1))
+                        for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_path)
+
+    def test_save_audio_files_accepts_a_generator(self):
+        # Act
+        results = self.client.saveAudioFiles(self.dest_path, (window for window in self.windows), max_workers=2)
+        # Assert
+        self.assertEqual(3, len(results))
+        self.assertEqual(3, len(os.listdir(self.dest_path)))
+
+    def test_fetch_audios_accepts_a_generator(self):
+        # Act
+        results = self.client.fetchAudios((window for window in self.windows), max_workers=2)
+        # Assert
+        self.assertEqual(3, len(results))
+        self.assertTrue(all(result is not None for result in results))
+
+    def test_stitch_other_format_raises(self):
+        with self.assertRaises(ValueError):
+            self.client.saveAudioFiles(self.dest_path, self.windows, file_ext='flac', stitch=True)
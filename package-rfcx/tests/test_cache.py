@@ -0,0 +1,118 @@
+from unittest import TestCase, mock
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from rfcx._cache import ResponseCache
+
+HISTORICAL_URL = 'https://api.rfcx.org/detections?start=2020-01-01T00:00:00Z&end=2020-01-02T00:00:00Z&limit=10'
+RECENT_URL = 'https://api.rfcx.org/detections?start=2020-01-01T00:00:00Z&end={}&limit=10'.format(
+    (datetime.datetime.utcnow() + datetime.timedelta(hours=1)).isoformat() + 'Z')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 1000000.0
+        patcher = mock.patch('rfcx._cache.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache(self, **kwargs):
+        return ResponseCache(os.path.join(self.directory, 'cache'), **kwargs)
+
+    def test_recent_responses_expire(self):
+        # Arrange
+        cache = self.cache(recent_ttl=datetime.timedelta(minutes=5))
+        cache.set(RECENT_URL, b'[1]')
+        # Act
+        self.now = self.now + 4 * 60
+        before = cache.get(RECENT_URL)
+        self.now = self.now + 2 * 60
+        after = cache.get(RECENT_URL)
+        # Assert
+        self.assertEqual(b'[1]', before)
+        self.assertIsNone(after)
+
+    def test_historical_responses_are_kept_longer(self):
+        # Arrange
+        cache = self.cache(historical_ttl=datetime.timedelta(days=30))
+        cache.set(HISTORICAL_URL, b'[1]')
+        # Act
+        self.now = self.now + 29 * 86400
+        before = cache.get(HISTORICAL_URL)
+        self.now = self.now + 2 * 86400
+        after = cache.get(HISTORICAL_URL)
+        # Assert
+        self.assertEqual(b'[1]', before)
+        self.assertIsNone(after)
+
+    def test_query_order_does_not_matter(self):
+        # Arrange
+        cache = self.cache()
+        cache.set('https://api.rfcx.org/streams?a=1&b=2', b'[]')
+        # Assert
+        self.assertEqual(b'[]', cache.get('https://API.rfcx.org/streams?b=2&a=1'))
+
+    def test_responses_are_per_identity(self):
+        # Arrange
+        cache = self.cache()
+        cache.identity = 'user1'
+        cache.set(HISTORICAL_URL, b'[1]')
+        # Act
+        cache.identity = 'user2'
+        other = cache.get(HISTORICAL_URL)
+        # Assert
+        self.assertIsNone(other)
+
+    def test_least_recently_used_are_evicted(self):
+        # Arrange
+        cache = self.cache(max_bytes=25)
+        for i in range(2):
+            cache.set(HISTORICAL_URL + '&offset={}'.format(i), b'x' * 10)
+            self.now = self.now + 1
+        # Act
+        cache.get(HISTORICAL_URL + '&offset=0')
+        self.now = self.now + 1
+        cache.set(HISTORICAL_URL + '&offset=2', b'x' * 10)
+        # Assert
+        self.assertIsNotNone(cache.get(HISTORICAL_URL + '&offset=0'))
+        self.assertIsNone(cache.get(HISTORICAL_URL + '&offset=1'))
+        self.assertIsNotNone(cache.get(HISTORICAL_URL + '&offset=2'))
+        stats = cache.stats()
+        self.assertEqual((2, 20, 1), (stats['entries'], stats['bytes'], stats['evictions']))
+
+    def test_expired_responses_are_evicted_first(self):
+        # Arrange
+        cache = self.cache(max_bytes=25, recent_ttl=datetime.timedelta(minutes=5))
+        cache.set(HISTORICAL_URL, b'x' * 10)
+        self.now = self.now + 1
+        # The recent response is the most recently used
+        cache.set(RECENT_URL, b'x' * 10)
+        # Act
+        self.now = self.now + 10 * 60
+        cache.set(HISTORICAL_URL + '&offset=1', b'x' * 10)
+        # Assert
+        self.assertIsNotNone(cache.get(HISTORICAL_URL))
+        self.assertEqual(2, cache.stats()['entries'])
+
+    def test_responses_larger_than_the_cache_are_not_stored(self):
+        # Arrange
+        cache = self.cache(max_bytes=5)
+        # Act
+        cache.set(HISTORICAL_URL, b'x' * 10)
+        # Assert
+        self.assertIsNone(cache.get(HISTORICAL_URL))
+
+    def test_persisted_across_instances(self):
+        # Arrange
+        self.cache().set(HISTORICAL_URL, b'[1]')
+        # Act
+        body = self.cache().get(HISTORICAL_URL)
+        # Assert
+        self.assertEqual(b'[1]', body)
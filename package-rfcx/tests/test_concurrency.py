@@ -0,0 +1,123 @@
+from unittest import TestCase
+
+import threading
+
+from rfcx._concurrency import AdaptiveLimiter, CancellationToken, is_congestion
+
+
+class IsCongestionTests(TestCase):
+    def test_transient_failures(self):
+        for status in (None, 429, 500, 502, 503, 504):
+            self.assertTrue(is_congestion(status), status)
+
+    def test_permanent_failures(self):
+        for status in (200, 206, 400, 403, 404, 416):
+            self.assertFalse(is_congestion(status), status)
+
+
+class AdaptiveLimiterTests(TestCase):
+    def run_tasks(self, limiter, count, latency=0.0, failed=False, status=None):
+        for _ in range(count):
+            limiter.acquire()
+            limiter.release(latency, 100, failed=failed, status=status)
+
+    def settled(self, limit=100):
+        limiter = AdaptiveLimiter(max_limit=limit)
+        self.run_tasks(limiter, limit)
+        return limiter
+
+    def test_slow_start_adds_one_per_task(self):
+        # Arrange
+        limiter = AdaptiveLimiter(initial_limit=4)
+        # Act
+        self.run_tasks(limiter, 4)
+        # Assert
+        self.assertEqual(8, limiter.limit)
+
+    def test_limit_is_bounded(self):
+        # Arrange
+        limiter = AdaptiveLimiter(min_limit=2, max_limit=10)
+        # Act
+        self.run_tasks(limiter, 50)
+        self.assertEqual(10, limiter.limit)
+        self.run_tasks(limiter, 50, failed=True)
+        # Assert
+        self.assertEqual(2, limiter.limit)
+
+    def test_transient_failure_halves_the_limit(self):
+        for status in (None, 503):
+            # Arrange
+            limiter = self.settled()
+            # Act
+            self.run_tasks(limiter, 1, failed=True, status=status)
+            # Assert
+            self.assertEqual(50, limiter.limit, status)
+
+    def test_permanent_failures_keep_the_limit(self):
+        # Arrange
+        limiter = self.settled()
+        # Act
+        self.run_tasks(limiter, 10, latency=0.0, failed=True, status=404)
+        # Assert
+        self.assertEqual(100, limiter.limit)
+        self.assertEqual(10, limiter.stats()['failed'])
+
+    def test_additive_increase_after_congestion(self):
+        # Arrange
+        limiter = self.settled(limit=100)
+        self.run_tasks(limiter, 1, failed=True)
+        # Act
+        self.run_tasks(limiter, 50)
+        # Assert
+        self.assertAlmostEqual(51, limiter.limit, places=0)
+
+    def test_latency_increase_decreases_once_per_round_trip(self):
+        # Arrange
+        limiter = AdaptiveLimiter(max_limit=64)
+        self.run_tasks(limiter, 60, latency=0.01)
+        # Act
+        self.run_tasks(limiter, 30, latency=60.0)
+        # Assert
+        self.assertEqual(32, limiter.limit)
+        self.assertFalse(limiter._slow_start)
+
+    def test_throttling_decreases(self):
+        # Arrange
+        limiter = self.settled()
+        # Act
+        limiter.throttled()
+        # Assert
+        self.assertEqual(50, limiter.limit)
+        self.assertEqual(1, limiter.stats()['throttled'])
+
+    def test_acquire_waits_for_a_free_slot(self):
+        # Arrange
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        # Act
+        thread.start()
+        waited = not acquired.wait(0.1)
+        limiter.release(0.0)
+        thread.join(1)
+        # Assert
+        self.assertTrue(waited)
+        self.assertTrue(acquired.is_set())
+
+
+class CancellationTokenTests(TestCase):
+    def test_cancel(self):
+        # Arrange
+        token = CancellationToken()
+        self.assertEqual((False, None), (token.cancelled, token.reason))
+        # Act
+        token.cancel()
+        # Assert
+        self.assertEqual((True, 'Cancelled'), (token.cancelled, token.reason))
+
+    def test_deadline(self):
+        # Act
+        token = CancellationToken(deadline=0)
+        # Assert
+        self.assertEqual((True, 'Deadline exceeded'), (token.cancelled, token.reason))
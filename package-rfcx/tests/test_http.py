@@ -0,0 +1,158 @@
+from unittest import TestCase, mock
+
+import datetime
+import email.utils
+import io
+
+import requests
+
+from rfcx._http import RetryPolicy, Session, _parse_retry_after
+
+
+def response(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.raw = io.BytesIO(b'')
+    resp.headers.update(headers or {})
+    return resp
+
+
+class RetryPolicyTests(TestCase):
+    def test_retries_connection_errors_up_to_max_attempts(self):
+        # Arrange
+        policy = RetryPolicy(max_attempts=3)
+        # Assert
+        self.assertTrue(policy.should_retry(1))
+        self.assertTrue(policy.should_retry(2))
+        self.assertFalse(policy.should_retry(3))
+
+    def test_retries_only_transient_statuses(self):
+        # Arrange
+        policy = RetryPolicy()
+        # Assert
+        for status in (408, 429, 500, 502, 503, 504):
+            self.assertTrue(policy.should_retry(1, status), status)
+        for status in (200, 400, 401, 403, 404):
+            self.assertFalse(policy.should_retry(1, status), status)
+
+    def test_status_max_attempts(self):
+        # Arrange
+        policy = RetryPolicy(max_attempts=5, status_max_attempts={500: 2})
+        # Assert
+        self.assertTrue(policy.should_retry(1, 500))
+        self.assertFalse(policy.should_retry(2, 500))
+        self.assertTrue(policy.should_retry(4, 503))
+
+    def test_delay_backs_off_exponentially_up_to_max_backoff(self):
+        # Arrange
+        policy = RetryPolicy(backoff=0.5, max_backoff=3)
+        # Act
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            delays = [policy.delay(attempt) for attempt in range(1, 6)]
+        # Assert
+        self.assertEqual([0.5, 1, 2, 3, 3], delays)
+
+    def test_delay_has_full_jitter(self):
+        # Arrange
+        policy = RetryPolicy(backoff=1)
+        # Act
+        delays = [policy.delay(3) for _ in range(100)]
+        # Assert
+        self.assertTrue(all(0 <= delay <= 4 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_delay_honors_retry_after(self):
+        # Arrange
+        policy = RetryPolicy(max_retry_after=60)
+        # Assert
+        self.assertEqual(7, policy.delay(1, '7'))
+        self.assertEqual(60, policy.delay(1, '3600'))
+
+    def test_delay_ignores_invalid_retry_after(self):
+        # Arrange
+        policy = RetryPolicy(backoff=1)
+        # Assert
+        self.assertLessEqual(policy.delay(1, 'soon'), 1)
+
+
+class ParseRetryAfterTests(TestCase):
+    def test_seconds(self):
+        self.assertEqual(120, _parse_retry_after('120'))
+        self.assertEqual(0, _parse_retry_after('-5'))
+
+    def test_http_date(self):
+        # Arrange
+        date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+        # Act
+        seconds = _parse_retry_after(email.utils.format_datetime(date, usegmt=True))
+        # Assert
+        self.assertAlmostEqual(30, seconds, delta=2)
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(0, _parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'))
+
+    def test_invalid(self):
+        self.assertIsNone(_parse_retry_after('soon'))
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        self.session = Session(retry=RetryPolicy(max_attempts=3, backoff=0))
+
+    def request(self, method, responses, **kwargs):
+        with mock.patch.object(requests.Session, 'request', side_effect=responses) as request:
+            try:
+                return getattr(self.session, method)('http://example.com', **kwargs), request.call_count
+            except requests.RequestException as e:
+                return e, request.call_count
+
+    def test_get_is_retried(self):
+        # Act
+        resp, calls = self.request('get', [response(503), requests.ConnectionError(), response(200)])
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(3, calls)
+
+    def test_gives_up_after_max_attempts(self):
+        # Act
+        resp, calls = self.request('get', [response(503)] * 5)
+        # Assert
+        self.assertEqual(503, resp.status_code)
+        self.assertEqual(3, calls)
+
+    def test_post_is_not_retried(self):
+        # Act
+        resp, calls = self.request('post', [response(503), response(200)], data={'filename': 'a.wav'})
+        error, error_calls = self.request('post', [requests.ConnectionError(), response(200)])
+        # Assert
+        self.assertEqual((503, 1), (resp.status_code, calls))
+        self.assertIsInstance(error, requests.ConnectionError)
+        self.assertEqual(1, error_calls)
+
+    def test_post_retried_when_idempotent(self):
+        # Act
+        resp, calls = self.request('post', [response(503), response(200)], idempotent=True)
+        # Assert
+        self.assertEqual((200, 2), (resp.status_code, calls))
+
+    def test_streamed_body_is_not_retried(self):
+        # Act
+        resp, calls = self.request('put', [response(503), response(200)], data=iter([b'a', b'b']))
+        # Assert
+        self.assertEqual((503, 1), (resp.status_code, calls))
+
+    def test_default_timeout(self):
+        # Act
+        with mock.patch.object(requests.Session, 'request', return_value=response(200)) as request:
+            Session(timeout=(1, 2)).get('http://example.com')
+        # Assert
+        self.assertEqual((1, 2), request.call_args[1]['timeout'])
+
+    def test_positional_arguments(self):
+        # Act
+        with mock.patch.object(requests.Session, 'request', return_value=response(200)) as request:
+            self.session.request('GET', 'http://example.com', {'limit': 10}, None, {'Accept': 'a'})
+        # Assert
+        self.assertEqual({'limit': 10}, request.call_args[1]['params'])
+        self.assertEqual({'Accept': 'a'}, request.call_args[1]['headers'])
+        self.assertEqual(self.session.timeout, request.call_args[1]['timeout'])
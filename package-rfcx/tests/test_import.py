@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+import os
+import subprocess
+import sys
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = '''
+import sys, time
+sys.path.insert(0, {path!r})
+started = time.perf_counter()
+import rfcx
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(','.join(sorted(sys.modules)))
+'''
+
+IMPORT_BUDGET_SECONDS = 0.1
+
+
+class ImportTests(TestCase):
+    def test_import_rfcx_is_lazy(self):
+        # Act
+        script = MEASURE.format(path=PACKAGE_ROOT)
+        output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True).splitlines()
+        elapsed, modules = float(output[0]), set(output[1].split(','))
+        # Assert
+        for heavy in ['requests', 'concurrent.futures', 'numpy', 'aiohttp', 'rfcx.client']:
+            self.assertNotIn(heavy, modules)
+        self.assertLess(elapsed, IMPORT_BUDGET_SECONDS)
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+import datetime
+import os
+import shutil
+import tempfile
+
+import rfcx.ingest as ingest
+
+
+class NoNetworkSession(object):
+    def __getattr__(self, name):
+        raise AssertionError('No request expected, got {}'.format(name))
+
+
+class IngestDirectoryTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for name in ('20200101_000000.wav', 'notes.wav', 'x.wav'):
+            open(os.path.join(self.path, name), 'wb').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_failing_timestamp_parser_skips_the_file(self):
+        # Arrange
+        def parser(filepath):
+            name = os.path.basename(filepath)
+            if name == 'notes.wav':
+                return None
+            if name == 'x.wav':
+                return datetime.datetime.strptime(name.split('_')[1], '%H%M%S')
+            return datetime.datetime.strptime(name, 1)
+        # Act
+        summary = ingest.ingest_directory(None, 'stream1', self.path, parser, session=NoNetworkSession())
+        # Assert
+        outcomes = {os.path.basename(outcome['path']): outcome for outcome in summary['files']}
+        self.assertEqual(3, summary[ingest.SKIPPED])
+        self.assertEqual('No timestamp', outcomes['notes.wav']['reason'])
+        self.assertIn('IndexError', outcomes['x.wav']['reason'])
+        self.assertIn('TypeError', outcomes['20200101_000000.wav']['reason'])
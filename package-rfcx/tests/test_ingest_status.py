@@ -0,0 +1,128 @@
+from unittest import TestCase
+
+import collections
+import threading
+import time
+
+from rfcx._ingest_status import StatusPoller
+
+
+class FakeStatus(object):
+    """Upload statuses: pending (10) for `pending_polls` polls, then `final`"""
+    def __init__(self, pending_polls=2, final=None, errors=0):
+        self.pending_polls = pending_polls
+        self.final = final or {'status': 20}
+        self.errors = errors
+        self.polls = collections.Counter()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, upload_id):
+        with self._lock:
+            self.polls[upload_id] = self.polls[upload_id] + 1
+            count = self.polls[upload_id]
+            self.running = self.running + 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.005)
+        with self._lock:
+            self.running = self.running - 1
+        if count <= self.errors:
+            raise IOError('Connection reset')
+        if count <= self.errors + self.pending_polls:
+            return {'status': 10}
+        return dict(self.final, id=upload_id)
+
+
+class StatusPollerTests(TestCase):
+    def poller(self, fetch_status, **kwargs):
+        kwargs.setdefault('initial_delay', 0.01)
+        kwargs.setdefault('max_delay', 0.05)
+        return StatusPoller(fetch_status, **kwargs)
+
+    def test_resolves_once_processed(self):
+        # Arrange
+        fetch_status = FakeStatus(pending_polls=3)
+        # Act
+        with self.poller(fetch_status) as poller:
+            future = poller.track('up1')
+        # Assert
+        self.assertEqual({'status': 20, 'id': 'up1'}, future.result(timeout=0))
+        self.assertEqual(4, fetch_status.polls['up1'])
+
+    def test_failed_uploads_resolve_with_their_status(self):
+        # Arrange
+        final = {'status': 30, 'failureMessage': 'Corrupted file'}
+        # Act
+        with self.poller(FakeStatus(final=final)) as poller:
+            future = poller.track('up1')
+        # Assert
+        self.assertEqual(30, future.result(timeout=0)['status'])
+
+    def test_transient_errors_are_retried(self):
+        # Arrange
+        fetch_status = FakeStatus(pending_polls=1, errors=2)
+        # Act
+        with self.poller(fetch_status, max_errors=3) as poller:
+            future = poller.track('up1')
+        # Assert
+        self.assertEqual(20, future.result(timeout=0)['status'])
+        self.assertEqual(4, fetch_status.polls['up1'])
+
+    def test_gives_up_after_max_errors(self):
+        # Act
+        with self.poller(FakeStatus(errors=100), max_errors=3) as poller:
+            future = poller.track('up1')
+        # Assert
+        with self.assertRaises(IOError):
+            future.result(timeout=0)
+
+    def test_invalid_responses_count_as_errors(self):
+        # Act
+        with self.poller(lambda upload_id: {'message': 'Not found'}, max_errors=2) as poller:
+            future = poller.track('up1')
+        # Assert
+        with self.assertRaises(ValueError):
+            future.result(timeout=0)
+
+    def test_polls_in_bounded_batches(self):
+        # Arrange
+        fetch_status = FakeStatus(pending_polls=2)
+        # Act
+        with self.poller(fetch_status, batch_size=4) as poller:
+            futures = [poller.track('up{}'.format(i)) for i in range(20)]
+        # Assert
+        self.assertTrue(all(future.result(timeout=0)['status'] == 20 for future in futures))
+        self.assertLessEqual(fetch_status.max_running, 4)
+        self.assertEqual([3] * 20, [fetch_status.polls['up{}'.format(i)] for i in range(20)])
+
+    def test_callback(self):
+        # Arrange
+        results = []
+        # Act
+        with self.poller(FakeStatus(pending_polls=0)) as poller:
+            poller.track('up1', lambda future: results.append(future.result()['id']))
+        # Assert
+        self.assertEqual(['up1'], results)
+
+    def test_backoff_grows_up_to_max_delay(self):
+        # Arrange
+        times = []
+        def fetch_status(upload_id):
+            times.append(time.monotonic())
+            return {'status': 10} if len(times) < 6 else {'status': 20}
+        # Act
+        with self.poller(fetch_status, initial_delay=0.01, max_delay=0.03) as poller:
+            poller.track('up1')
+        # Assert
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        self.assertGreater(gaps[1], 0.01 * 0.8)
+        self.assertTrue(all(gap < 0.03 * 1.2 + 0.02 for gap in gaps))
+
+    def test_track_after_close_raises(self):
+        # Arrange
+        poller = self.poller(FakeStatus())
+        poller.close()
+        # Assert
+        with self.assertRaises(RuntimeError):
+            poller.track('up1')
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import json
+
+from rfcx._json_stream import iter_json_array
+
+DOCUMENTS = [
+    b'[]',
+    b'[1.5, 2e3, -0.25E-2, 12345, 0]',
+    b'[ {"id": "seg1", "start": "2020-01-01T00:00:00.000Z"} , {"values": [1, 2.5, [3]]} ]',
+    b'["a,b]", "\\"[", true, false, null, "\xc3\xa9t\xc3\xa9"]',
+]
+
+
+class IterJsonArrayTests(TestCase):
+    def test_every_split_point(self):
+        for document in DOCUMENTS:
+            expected = json.loads(document.decode('utf-8'))
+            for split in range(len(document) + 1):
+                # Act
+                elements = list(iter_json_array([document[:split], document[split:]]))
+                # Assert
+                self.assertEqual(expected, elements, 'split {} of {!r}'.format(split, document))
+
+    def test_one_byte_chunks(self):
+        for document in DOCUMENTS:
+            # Act
+            elements = list(iter_json_array(document[i:i + 1] for i in range(len(document))))
+            # Assert
+            self.assertEqual(json.loads(document.decode('utf-8')), elements)
+
+    def test_yields_elements_before_the_end(self):
+        # Arrange
+        chunks = iter([b'[{"id": 1}, ', b'{"id": 2}', b']'])
+        # Act
+        elements = iter_json_array(chunks)
+        # Assert
+        self.assertEqual({'id': 1}, next(elements))
+        self.assertEqual(b'{"id": 2}', next(chunks))
+
+    def test_unterminated_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[1, 2']))
+
+    def test_not_an_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"id": 1}']))
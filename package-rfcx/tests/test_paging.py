@@ -0,0 +1,164 @@
+from unittest import TestCase
+
+import datetime
+import threading
+
+from rfcx._paging import PageError, iter_pages, iter_pages_parallel, iter_sharded_records
+
+
+class FakeListing(object):
+    """`fetch_page` over `count` records, recording the offsets requested"""
+    def __init__(self, count):
+        self.count = count
+        self.offsets = []
+        self._lock = threading.Lock()
+
+    def __call__(self, limit, offset):
+        with self._lock:
+            self.offsets.append(offset)
+        return list(range(offset, min(offset + limit, self.count)))
+
+
+class IterPagesTests(TestCase):
+    def test_stops_after_short_page(self):
+        # Arrange
+        listing = FakeListing(250)
+        # Act
+        pages = list(iter_pages(listing, limit=100))
+        # Assert
+        self.assertEqual([100, 100, 50], [len(page) for page in pages])
+        self.assertEqual([0, 100, 200], listing.offsets)
+
+    def test_stops_after_empty_page(self):
+        # Arrange
+        listing = FakeListing(200)
+        # Act
+        pages = list(iter_pages(listing, limit=100))
+        # Assert
+        self.assertEqual(2, len(pages))
+        self.assertEqual([0, 100, 200], listing.offsets)
+
+
+class IterPagesParallelTests(TestCase):
+    def test_yields_pages_in_order(self):
+        # Arrange
+        listing = FakeListing(2500)
+        # Act
+        records = [record for page in iter_pages_parallel(listing, limit=100) for record in page]
+        # Assert
+        self.assertEqual(list(range(2500)), records)
+
+    def test_few_requests_past_the_end(self):
+        # Arrange
+        listing = FakeListing(2500)
+        # Act
+        list(iter_pages_parallel(listing, limit=1000))
+        # Assert
+        self.assertEqual([0, 1000, 2000], sorted(listing.offsets)[:3])
+        self.assertLessEqual(len(listing.offsets), 6)
+
+    def test_window_is_bounded(self):
+        # Arrange
+        listing = FakeListing(100000)
+        # Act
+        list(iter_pages_parallel(listing, limit=100, max_window=4))
+        # Assert
+        self.assertLessEqual(len(listing.offsets), 1000 + 4)
+
+
+class FailingListing(FakeListing):
+    """`FakeListing` failing (returning None) at `fail_offset`"""
+    def __init__(self, count, fail_offset):
+        super(FailingListing, self).__init__(count)
+        self.fail_offset = fail_offset
+
+    def __call__(self, limit, offset):
+        page = super(FailingListing, self).__call__(limit, offset)
+        return None if offset == self.fail_offset else page
+
+
+class PageErrorTests(TestCase):
+    def test_iter_pages_raises_on_failed_page(self):
+        # Arrange
+        listing = FailingListing(500, 200)
+        # Act
+        pages = iter_pages(listing, limit=100)
+        # Assert
+        self.assertEqual(2, len([next(pages), next(pages)]))
+        with self.assertRaises(PageError):
+            next(pages)
+
+    def test_iter_pages_parallel_raises_on_failed_page(self):
+        with self.assertRaises(PageError):
+            list(iter_pages_parallel(FailingListing(500, 300), limit=100))
+
+    def test_iter_sharded_records_raises_on_failed_window(self):
+        # Arrange
+        def fetch_window(start, end, limit, offset):
+            return None if start.startswith('2020-01-01T12') else []
+        # Act
+        with self.assertRaises(PageError):
+            list(iter_sharded_records(fetch_window, '2020-01-01T00:00:00Z', '2020-01-02T00:00:00Z', shards=4))
+
+
+def detection(minute, classifier_id, classification='chainsaw'):
+    start = '2020-01-01T00:{:02d}:00.000Z'.format(minute)
+    end = '2020-01-01T00:{:02d}:30.000Z'.format(minute)
+    return {'stream_id': 'stream1', 'classification': {'value': classification}, 'classifier_id': classifier_id,
+            'start': start, 'end': end}
+
+
+class FakeDetections(object):
+    """`fetch_window` over `records`, returning those overlapping the window and recording the windows"""
+    def __init__(self, records):
+        self.records = records
+        self.windows = []
+        self._lock = threading.Lock()
+
+    def __call__(self, start, end, limit, offset):
+        with self._lock:
+            self.windows.append((start, end, offset))
+        overlapping = [record for record in self.records if record['start'] < end and record['end'] > start]
+        return overlapping[offset:offset + limit]
+
+
+class IterShardedRecordsTests(TestCase):
+    def sharded(self, detections, **kwargs):
+        return list(iter_sharded_records(detections, '2020-01-01T00:00:00Z', '2020-01-01T01:00:00Z', **kwargs))
+
+    def test_full_windows_are_split(self):
+        # Arrange
+        detections = FakeDetections([detection(minute, 1) for minute in range(60)])
+        # Act
+        records = self.sharded(detections, shards=2, limit=10)
+        # Assert
+        self.assertEqual(sorted(detections.records, key=lambda r: r['start']),
+                         sorted(records, key=lambda r: r['start']))
+        self.assertGreater(len(detections.windows), 2)
+        self.assertTrue(all(offset == 0 for _, _, offset in detections.windows))
+
+    def test_short_windows_are_paged(self):
+        # Arrange
+        detections = FakeDetections([detection(5, classifier_id) for classifier_id in range(25)])
+        # Act
+        records = self.sharded(detections, shards=1, limit=10, min_window=datetime.timedelta(hours=2))
+        # Assert
+        self.assertEqual(25, len(records))
+        self.assertEqual([0, 10, 20], [offset for _, _, offset in detections.windows])
+
+    def test_records_in_two_windows_are_yielded_once(self):
+        # Arrange
+        across = dict(detection(29, 1), end='2020-01-01T00:31:00.000Z')
+        detections = FakeDetections([detection(0, 1), across, detection(45, 1)])
+        # Act
+        records = self.sharded(detections, shards=2)
+        # Assert
+        self.assertEqual(3, len(records))
+
+    def test_same_detection_of_two_classifiers_is_kept(self):
+        # Arrange
+        detections = FakeDetections([detection(10, 1), detection(10, 2), detection(10, 1, 'gunshot')])
+        # Act
+        records = self.sharded(detections, shards=4)
+        # Assert
+        self.assertEqual(3, len(records))
@@ -0,0 +1,106 @@
+from unittest import TestCase
+
+import struct
+
+import numpy as np
+
+from rfcx._pcm import WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, decode_wav, parse_wav_header
+
+
+def chunk(chunk_id, data):
+    return chunk_id + struct.pack('<I', len(data)) + data + (b'\x00' if len(data) & 1 else b'')
+
+
+def fmt_chunk(audio_format=WAVE_FORMAT_PCM, channels=1, sample_rate=8000, bits=16, sub_format=None):
+    block_align = channels * bits // 8
+    data = struct.pack('<HHIIHH', audio_format, channels, sample_rate, sample_rate * block_align, block_align, bits)
+    if sub_format is not None:
+        data = data + struct.pack('<HHI', 22, bits, 0) + struct.pack('<H', sub_format) + b'\x00' * 14
+    return chunk(b'fmt ', data)
+
+
+def wav(samples, data_size=None, extra_chunks=b'', **fmt):
+    data = samples.tobytes()
+    size = len(data) if data_size is None else data_size
+    body = b'WAVE' + fmt_chunk(**fmt) + extra_chunks + b'data' + struct.pack('<I', size) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+class ParseWavHeaderTests(TestCase):
+    def test_pcm_16(self):
+        # Arrange
+        buffer = wav(np.arange(10, dtype='<i2'))
+        # Act
+        wav_format, offset, size = parse_wav_header(buffer)
+        # Assert
+        self.assertEqual((8000, 1, np.dtype('<i2')), (wav_format.sample_rate, wav_format.channels, wav_format.dtype))
+        self.assertEqual((44, 20), (offset, size))
+
+    def test_skips_other_chunks_with_padding(self):
+        # Arrange
+        buffer = wav(np.arange(4, dtype='<i2'), extra_chunks=chunk(b'LIST', b'odd'))
+        # Act
+        _, offset, size = parse_wav_header(buffer)
+        # Assert
+        self.assertEqual((44 + 12, 8), (offset, size))
+
+    def test_float_and_extensible_formats(self):
+        # Act
+        float_format = parse_wav_header(wav(np.zeros(2, '<f4'), audio_format=WAVE_FORMAT_IEEE_FLOAT, bits=32))[0]
+        extensible = parse_wav_header(wav(np.zeros(4, '<i4'), audio_format=WAVE_FORMAT_EXTENSIBLE, bits=32,
+                                          channels=2, sub_format=WAVE_FORMAT_PCM))[0]
+        # Assert
+        self.assertEqual(np.dtype('<f4'), float_format.dtype)
+        self.assertEqual((np.dtype('<i4'), 2, 8), (extensible.dtype, extensible.channels, extensible.frame_size))
+
+    def test_unknown_data_size(self):
+        for unknown in (0, 0xFFFFFFFF):
+            self.assertIsNone(parse_wav_header(wav(np.zeros(2, '<i2'), data_size=unknown))[2])
+
+    def test_incomplete_header(self):
+        # Arrange
+        buffer = wav(np.zeros(2, '<i2'))
+        # Assert
+        for length in (0, 8, 20, 40):
+            self.assertIsNone(parse_wav_header(buffer[:length]), length)
+
+    def test_invalid_files_raise(self):
+        with self.assertRaises(ValueError):
+            parse_wav_header(b'RIFF\x00\x00\x00\x00AVI LIST')
+        with self.assertRaises(ValueError):
+            parse_wav_header(b'RIFF\x00\x00\x00\x00WAVE' + b'data\x00\x00\x00\x00')
+        with self.assertRaises(ValueError):
+            parse_wav_header(wav(np.zeros(2, '<i2'), bits=12))
+
+
+class DecodeWavTests(TestCase):
+    def test_stereo_view(self):
+        # Arrange
+        samples = np.arange(12, dtype='<i2').reshape(6, 2)
+        buffer = bytearray(wav(samples, channels=2))
+        # Act
+        decoded, sample_rate = decode_wav(buffer)
+        # Assert
+        self.assertEqual(8000, sample_rate)
+        np.testing.assert_array_equal(samples, decoded)
+        buffer[-2:] = b'\xff\x7f'
+        self.assertEqual(32767, decoded[-1, 1])
+
+    def test_truncated_data(self):
+        # Arrange
+        buffer = wav(np.arange(10, dtype='<i2'))[:-3]
+        # Act
+        decoded, _ = decode_wav(buffer)
+        # Assert
+        np.testing.assert_array_equal(np.arange(8), decoded)
+
+    def test_pcm_24(self):
+        # Arrange
+        values = np.array([0, 1, -1, 8388607, -8388608, 123456], dtype='<i4').reshape(3, 2)
+        raw = np.frombuffer(values.astype('<i4').tobytes(), dtype=np.uint8).reshape(-1, 4)[:, :3]
+        buffer = wav(raw, channels=2, bits=24)
+        # Act
+        decoded, _ = decode_wav(buffer)
+        # Assert
+        self.assertEqual(np.dtype('<i4'), decoded.dtype)
+        np.testing.assert_array_equal(values, decoded)
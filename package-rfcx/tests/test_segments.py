@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import numpy as np
+
+from rfcx.audio import iso_to_rfcx_custom_format
+from rfcx._segments import SegmentTable
+
+MEDIA_HOST = 'https://media-api.rfcx.org'
+
+SEGMENTS = [
+    {'id': 'a1', 'stream': {'id': 'stream1'}, 'start': '2020-01-01T00:00:00.000Z', 'end': '2020-01-01T00:01:00.000Z'},
+    {'id': 'a2', 'stream': {'id': 'stream1'}, 'start': '2020-01-01T00:01:00Z', 'end': '2020-01-01T00:02:00Z'},
+    {'id': 'b1', 'stream': {'id': 'stream22'}, 'start': '2020-01-01T00:02:00.250Z', 'end': '2020-01-01T00:03:00.5Z'},
+]
+
+
+def segment_url_and_path(save_path, segment, gain, file_ext):
+    """Per segment formatting replaced by `SegmentTable.urls_and_paths`"""
+    stream_id = segment['stream']['id']
+    start = iso_to_rfcx_custom_format(segment['start'])
+    end = iso_to_rfcx_custom_format(segment['end'])
+    rfcx_audio_format = '{}_t{}.{}_rfull_g{}_f{}'.format(stream_id, start, end, gain, file_ext)
+    url = MEDIA_HOST + '/internal/assets/streams/' + rfcx_audio_format + '.' + file_ext
+    local_path = '{}/{}_{}_{}_gain{}.{}'.format(save_path, stream_id, start, segment['id'], gain, file_ext)
+    return url, local_path
+
+
+class SegmentTableTests(TestCase):
+    def test_urls_and_paths_match_per_segment_formatting(self):
+        # Arrange
+        table = SegmentTable.from_records(SEGMENTS)
+        # Act
+        urls, paths = table.urls_and_paths(MEDIA_HOST, '/data', 2, 'flac')
+        # Assert
+        for i, segment in enumerate(SEGMENTS):
+            self.assertEqual(segment_url_and_path('/data', segment, 2, 'flac'), (urls[i], paths[i]))
+
+    def test_times_without_milliseconds_are_kept(self):
+        # Act
+        urls, _ = SegmentTable.from_records(SEGMENTS[1:2]).urls_and_paths(MEDIA_HOST, '/data')
+        # Assert
+        self.assertIn('_t20200101T000100Z.20200101T000200Z_', urls[0])
+
+    def test_indexing_returns_the_segments(self):
+        # Arrange
+        table = SegmentTable.from_records(SEGMENTS)
+        # Act
+        segments = list(table)
+        # Assert
+        self.assertEqual(SEGMENTS, segments)
+        self.assertEqual(SEGMENTS[1:], list(table[1:]))
+
+    def test_from_pages_removes_duplicates(self):
+        # Act
+        table = SegmentTable.from_pages([SEGMENTS[:2], [], SEGMENTS[1:]])
+        # Assert
+        self.assertEqual(['a1', 'a2', 'b1'], list(table.ids))
+        self.assertEqual(SEGMENTS, list(table))
+
+    def test_datetime64_times_have_milliseconds(self):
+        # Arrange
+        starts = np.array(['2020-01-01T00:00:00'], dtype='datetime64[s]')
+        ends = np.array(['2020-01-01T00:01:00'], dtype='datetime64[s]')
+        # Act
+        segment = SegmentTable(['a1'], ['stream1'], starts, ends)[0]
+        # Assert
+        self.assertEqual(SEGMENTS[0], segment)
+
+    def test_columns_of_different_lengths_raise(self):
+        with self.assertRaises(ValueError):
+            SegmentTable(['a1', 'a2'], ['stream1'], ['2020-01-01T00:00:00Z'], ['2020-01-01T00:01:00Z'])
@@ -0,0 +1,238 @@
+from unittest import TestCase
+
+import io
+import os
+import re
+import shutil
+import tempfile
+
+import requests
+
+from rfcx import _upload as upload
+
+RESUMABLE_URL = 'https://storage.googleapis.com/upload/rfcx?uploadType=resumable&upload_id=abc'
+PRESIGNED_URL = 'https://rfcx-ingest.s3.amazonaws.com/a.wav?X-Amz-Signature=abc'
+CHUNK = upload.CHUNK_ALIGNMENT
+
+
+def response(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp.raw = io.BytesIO(b'')
+    return resp
+
+
+class FakeResumableSession(object):
+    """Resumable upload session of a storage service (e.g. Google Cloud Storage)
+
+    Chunks are answered 308 with the `Range` persisted so far, the last one 200. `faults` maps the
+    index of a chunk request to what goes wrong: an `Exception` to raise, a status to answer without
+    persisting the chunk, or `'half'` to persist only half of the chunk.
+    """
+    def __init__(self, faults=None, status_faults=None):
+        self.faults = dict(faults or {})
+        self.status_faults = dict(status_faults or {})
+        self.received = bytearray()
+        self.chunks = []
+        self.status_queries = 0
+
+    def put(self, url, data=None, headers=None, allow_redirects=True):
+        content_range = headers.get('Content-Range', '')
+        match = re.match(r'bytes (\d+)-(\d+)/(\d+)', content_range)
+        if match is None:
+            total = int(content_range.rpartition('/')[2])
+            self.status_queries = self.status_queries + 1
+            fault = self.status_faults.get(self.status_queries - 1)
+            if fault is not None:
+                return response(fault)
+            return self._answer(total)
+        start, end, total = (int(group) for group in match.groups())
+        body = data.read()
+        self.assertEqual(end - start + 1, len(body), int(headers['Content-Length']))
+        index = len(self.chunks)
+        self.chunks.append((start, end))
+        fault = self.faults.get(index)
+        if isinstance(fault, Exception):
+            raise fault
+        if isinstance(fault, int):
+            return response(fault)
+        if start > len(self.received):
+            return response(400)
+        if fault == 'half':
+            body = body[:len(body) // 2]
+        del self.received[start:]
+        self.received.extend(body)
+        return self._answer(total)
+
+    def assertEqual(self, *values):
+        assert len(set(values)) == 1, values
+
+    def _answer(self, total):
+        if len(self.received) == total:
+            return response(200)
+        if not self.received:
+            return response(upload.RESUME_INCOMPLETE)
+        return response(upload.RESUME_INCOMPLETE, {'Range': 'bytes=0-{}'.format(len(self.received) - 1)})
+
+
+class PresignedSession(object):
+    def __init__(self):
+        self.requests = []
+
+    def put(self, url, data=None, headers=None, allow_redirects=True):
+        self.requests.append((headers, data.read()))
+        return response(200)
+
+
+class UploadFileTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.content = os.urandom(2 * CHUNK + 1000)
+        self.path = os.path.join(self.directory, 'a.wav')
+        with open(self.path, 'wb') as f:
+            f.write(self.content)
+        self.progress = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def upload(self, session, url=RESUMABLE_URL):
+        return upload.upload_file(url, self.path, 'audio/wav', session,
+                                  lambda sent, total: self.progress.append((sent, total)), chunk_size=CHUNK)
+
+    def test_is_resumable(self):
+        self.assertTrue(upload.is_resumable(RESUMABLE_URL))
+        self.assertFalse(upload.is_resumable(PRESIGNED_URL))
+
+    def test_presigned_url_is_one_put(self):
+        # Arrange
+        session = PresignedSession()
+        # Act
+        resp = self.upload(session, PRESIGNED_URL)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        headers, body = session.requests[0]
+        self.assertEqual(1, len(session.requests))
+        self.assertEqual(self.content, body)
+        self.assertEqual(str(len(self.content)), headers['Content-Length'])
+        self.assertNotIn('Content-Range', headers)
+
+    def test_chunks(self):
+        # Arrange
+        session = FakeResumableSession()
+        total = len(self.content)
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.content, bytes(session.received))
+        self.assertEqual([(0, CHUNK - 1), (CHUNK, 2 * CHUNK - 1), (2 * CHUNK, total - 1)], session.chunks)
+        self.assertEqual((total, total), self.progress[-1])
+
+    def test_resumes_from_range_of_308(self):
+        # Arrange
+        session = FakeResumableSession(faults={1: 'half'})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.content, bytes(session.received))
+        self.assertEqual(CHUNK + CHUNK // 2, session.chunks[2][0])
+
+    def test_308_without_range_restarts(self):
+        # Arrange
+        session = FakeResumableSession(faults={0: upload.RESUME_INCOMPLETE})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.content, bytes(session.received))
+        self.assertEqual([(0, CHUNK - 1), (0, CHUNK - 1)], session.chunks[:2])
+
+    def test_final_chunk_308_resumes(self):
+        # Arrange
+        session = FakeResumableSession(faults={2: 'half'})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.content, bytes(session.received))
+        self.assertEqual(4, len(session.chunks))
+
+    def test_failed_chunk_resumes_from_the_server_status(self):
+        # Arrange
+        session = FakeResumableSession(faults={1: requests.ConnectionError('reset'), 2: 503})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.content, bytes(session.received))
+        self.assertEqual(2, session.status_queries)
+        self.assertEqual([0, CHUNK, CHUNK, CHUNK, 2 * CHUNK], [start for start, _ in session.chunks])
+
+    def test_completed_upload_found_by_status_query(self):
+        # Arrange
+        class LostResponseSession(FakeResumableSession):
+            def put(self, url, data=None, headers=None, allow_redirects=True):
+                resp = super(LostResponseSession, self).put(url, data, headers, allow_redirects)
+                if len(self.chunks) == 3 and self.status_queries == 0:
+                    raise requests.ConnectionError('Response lost')
+                return resp
+        session = LostResponseSession()
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual((3, 1), (len(session.chunks), session.status_queries))
+
+    def test_client_errors_are_returned(self):
+        # Arrange
+        session = FakeResumableSession(faults={1: 403})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(403, resp.status_code)
+        self.assertEqual(2, len(session.chunks))
+
+    def test_gives_up_after_max_resumes(self):
+        # Arrange
+        session = FakeResumableSession(faults={i: 503 for i in range(1, 100)})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(503, resp.status_code)
+        self.assertEqual(upload.MAX_RESUMES, session.status_queries)
+
+    def test_failed_status_query_returns_the_failure(self):
+        # Arrange
+        session = FakeResumableSession(faults={1: 503}, status_faults={0: 404})
+        # Act
+        resp = self.upload(session)
+        # Assert
+        self.assertEqual(503, resp.status_code)
+
+    def test_empty_file(self):
+        # Arrange
+        open(self.path, 'wb').close()
+        session = PresignedSession()
+        # Act
+        resp = upload.upload_file(RESUMABLE_URL, self.path, 'audio/wav', session)
+        # Assert
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(({'Content-Type': 'audio/wav', 'Content-Length': '0'}, b''), session.requests[0])
+
+
+class ProgressReaderTests(TestCase):
+    def test_reads_a_range_and_rewinds_progress(self):
+        # Arrange
+        progress = []
+        reader = upload.ProgressReader(io.BytesIO(b'0123456789'), 2, 5, progress.append, sent_before=100)
+        # Act
+        first = reader.read(3)
+        reader.seek(0)
+        whole = reader.read()
+        # Assert
+        self.assertEqual((b'234', b'23456'), (first, whole))
+        self.assertEqual([103, 105], progress)
+        self.assertEqual(b'', reader.read())